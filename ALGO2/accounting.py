@@ -0,0 +1,23 @@
+# This is the average cost accounting RIT uses for positions and realized P&L
+#
+# mock_server.py books its fills with it and positions.py tracks ours with it, so the
+# tracker is checked against the same arithmetic it implements.
+
+
+# this applies a fill to (position, cost, realized) and returns the new values
+def average_cost_fill(position, cost, realized, action, quantity, price):
+    signed = quantity if action == 'BUY' else -quantity
+    if position == 0 or (position > 0) == (signed > 0):
+        return position + signed, cost + signed * price, realized
+    avg = cost / position
+    closed = min(abs(signed), abs(position))
+    direction = 1 if position > 0 else -1
+    realized += closed * (price - avg) * direction
+    position += signed
+    if position == 0:
+        cost = 0.0
+    elif (position > 0) == (direction > 0):
+        cost = avg * position
+    else:
+        cost = price * position
+    return position, cost, realized
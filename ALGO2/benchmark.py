@@ -0,0 +1,168 @@
+# This runs each strategy script's main() against the local mock server and measures it
+#
+#   python benchmark.py                          # all scripts, results in benchmarks/<time>.json
+#   python benchmark.py alltogether edit --ticks 40 --compare benchmarks/20260101-120000.json
+#
+# Every script gets a fresh mock case on localhost:9999 (the URL the scripts have
+# hard-coded) running in its own process, so the server does not share the GIL with
+# the script being measured. The script's requests.Session is instrumented with
+# metrics.instrument_session, every GET /case counts as one loop iteration, and the
+# script's sleep() calls are scaled by tick_duration so a shortened case keeps the
+# same proportions as a real one.
+
+import argparse
+import importlib
+import json
+import multiprocessing
+import os
+import socket
+import time
+
+import requests
+
+from metrics import Metrics, endpoint_name, instrument_session
+from mock_server import MockExchange, MockServer
+
+SCRIPTS = ['MAIN_ALGO', 'MAIN_ALGO3', 'alltogether', 'edit', 'test']
+HOST = '127.0.0.1'
+PORT = 9999
+# ticks each script runs for, ending at the tick where every script's loop stops
+TICKS = 20
+LAST_TICK = 298
+TICK_DURATION = 0.25
+SEED = 7
+RESULTS_DIR = 'benchmarks'
+
+
+def _serve(tick_duration, start_tick, seed):
+    exchange = MockExchange(tick_duration=tick_duration, start_tick=start_tick, seed=seed)
+    MockServer(exchange, HOST, PORT).serve_forever()
+
+
+def _wait_for_port(timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection((HOST, PORT), timeout=0.1).close()
+            return
+        except OSError:
+            time.sleep(0.02)
+    raise RuntimeError('mock server did not start on %s:%d' % (HOST, PORT))
+
+
+class _RequestsShim:
+    """Stands in for the requests module inside a script so its Session is instrumented."""
+
+    def __init__(self, metrics):
+        self.metrics = metrics
+
+    def Session(self):
+        session = instrument_session(requests.Session(), self.metrics)
+        timed = session.request
+        metrics = self.metrics
+
+        def request(method, url, *args, **kwargs):
+            resp = timed(method, url, *args, **kwargs)
+            if endpoint_name(method, url) == 'GET /case' and resp.ok:
+                metrics.iteration(resp.json()['tick'])
+            return resp
+
+        session.request = request
+        return session
+
+
+# this runs one script's main() for `ticks` ticks of a fresh mock case and returns its numbers
+def run_script(name, ticks=TICKS, tick_duration=TICK_DURATION, seed=SEED):
+    module = importlib.import_module(name)
+    metrics = Metrics()
+    server = multiprocessing.Process(target=_serve, args=(tick_duration, LAST_TICK - ticks, seed), daemon=True)
+    server.start()
+    saved = {n: getattr(module, n) for n in ('requests', 'sleep')}
+    error = None
+    try:
+        _wait_for_port()
+        module.requests = _RequestsShim(metrics)
+        module.sleep = lambda seconds: time.sleep(seconds * tick_duration)
+        metrics.started = time.monotonic()
+        start = time.perf_counter()
+        try:
+            module.main()
+        except Exception as e:
+            error = '%s: %s' % (type(e).__name__, e)
+        elapsed = time.perf_counter() - start
+    finally:
+        for n, value in saved.items():
+            setattr(module, n, value)
+        server.terminate()
+        server.join()
+    return report(name, metrics, elapsed, error)
+
+
+def report(name, metrics, elapsed, error=None):
+    summary = metrics.summary()
+    endpoints = summary['endpoints']
+    iterations = summary['iterations']['iterations']
+    requests_made = sum(e['count'] for e in endpoints.values())
+    orders = endpoints.get('POST /orders', {}).get('count', 0)
+    return {
+        'script': name,
+        'seconds': elapsed,
+        'error': error,
+        'iterations': iterations,
+        'iterations_per_second': iterations / elapsed if elapsed else 0.0,
+        'iterations_per_tick': summary['iterations']['per_tick_mean'],
+        'orders': orders,
+        'orders_per_second': orders / elapsed if elapsed else 0.0,
+        'requests': requests_made,
+        'requests_per_iteration': requests_made / iterations if iterations else 0.0,
+        'endpoints': endpoints,
+    }
+
+
+# this prints how each script's headline numbers moved against an earlier results file
+def compare(results, previous):
+    before = {r['script']: r for r in previous['results']}
+    for r in results:
+        old = before.get(r['script'])
+        if old is None:
+            continue
+        changes = []
+        for key in ('iterations_per_second', 'orders_per_second', 'requests_per_iteration'):
+            if old[key]:
+                changes.append('%s %+.1f%%' % (key, 100 * (r[key] - old[key]) / old[key]))
+        print('%-12s %s' % (r['script'], ', '.join(changes)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the strategy scripts against the local mock server')
+    parser.add_argument('scripts', nargs='*', default=SCRIPTS)
+    parser.add_argument('--ticks', type=int, default=TICKS)
+    parser.add_argument('--tick-duration', type=float, default=TICK_DURATION)
+    parser.add_argument('--seed', type=int, default=SEED)
+    parser.add_argument('--out', default=None, help='results file (default: benchmarks/<time>.json)')
+    parser.add_argument('--compare', default=None, help='an earlier results file to compare against')
+    args = parser.parse_args()
+
+    results = []
+    for name in args.scripts:
+        result = run_script(name, args.ticks, args.tick_duration, args.seed)
+        results.append(result)
+        slowest = max(result['endpoints'].items(), key=lambda e: e[1]['p99'], default=('-', {'p99': 0.0}))
+        print('%-12s %7.1f it/s  %7.1f orders/s  %5.1f req/it  slowest p99 %.1fms %s%s' % (
+            name, result['iterations_per_second'], result['orders_per_second'], result['requests_per_iteration'],
+            slowest[1]['p99'] * 1000, slowest[0], '  (%s)' % result['error'] if result['error'] else ''))
+
+    out = args.out or os.path.join(RESULTS_DIR, time.strftime('%Y%m%d-%H%M%S') + '.json')
+    if os.path.dirname(out):
+        os.makedirs(os.path.dirname(out), exist_ok=True)
+    with open(out, 'w') as f:
+        json.dump({'created': time.time(), 'ticks': args.ticks, 'tick_duration': args.tick_duration,
+                   'seed': args.seed, 'results': results}, f, indent=2)
+    print('wrote %s' % out)
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f))
+
+# this calls the main() method when you type 'python benchmark.py' into the command prompt
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,171 @@
+# This decodes only the fields the strategies use out of RIT responses, and only when they changed
+#
+#   reader = FastReader(client)
+#   (bid, ask), changed = await reader.bid_ask('ALGO')
+#   if changed: ...recompute quotes...
+#
+# Every response body is compared with the last body seen for the same request. An
+# identical body returns the value decoded last time without parsing anything, and
+# changed=False tells the caller its own work on that value can be skipped too. A body
+# that did change is scanned for just the fields we need (top-of-book prices, close,
+# position, order ids) with compiled byte patterns instead of building the whole
+# JSON document, falling back to json.loads when a field is not where we expect it.
+
+import asyncio
+import json
+import re
+import signal
+
+from oms import OrderManager
+from quote_engine import QuoteEngine, target_ladder
+from rit_client import ApiException, RitClient
+
+NUMBER = rb'\s*:\s*(-?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?)'
+PRICE = re.compile(rb'"price"' + NUMBER)
+CLOSE = re.compile(rb'"close"' + NUMBER)
+POSITION = re.compile(rb'"position"' + NUMBER)
+ORDER_ID = re.compile(rb'"order_id"' + NUMBER)
+EMPTY = re.compile(rb'\s*:\s*\[\s*\]')
+# seconds between polls in main()
+POLL = 0.1
+
+shutdown = False
+
+# this signal handler allows for a graceful shutdown when CTRL+C is pressed
+def signal_handler(signum, frame):
+    global shutdown
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    shutdown = True
+
+
+def _number(text):
+    value = float(text)
+    return int(value) if value.is_integer() and b'.' not in text else value
+
+
+# this reads the first price in the bids and asks lists of a /securities/book body
+def decode_bid_ask(content):
+    bids = content.find(b'"bids"')
+    asks = content.find(b'"asks"')
+    if bids < 0 or asks < 0:
+        book = json.loads(content)
+        return book['bids'][0]['price'], book['asks'][0]['price']
+    prices = []
+    for start, other in ((bids, asks), (asks, bids)):
+        end = other if other > start else len(content)
+        if EMPTY.match(content, start + 6):
+            raise ApiException('Response error. Empty order book.')
+        match = PRICE.search(content, start, end)
+        if match is None:
+            raise ApiException('Response error. Empty order book.')
+        prices.append(float(match.group(1)))
+    return prices[0], prices[1]
+
+
+# this reads the newest close out of a /securities/history body
+def decode_close(content):
+    match = CLOSE.search(content)
+    if match is None:
+        history = json.loads(content)
+        if not history:
+            raise ApiException('Response error. Empty history.')
+        return history[0]['close']
+    return float(match.group(1))
+
+
+# this reads the position out of a /securities?ticker=... body
+def decode_position(content):
+    match = POSITION.search(content)
+    if match is None:
+        return json.loads(content)[0]['position']
+    return _number(match.group(1))
+
+
+# this reads every order id out of a /orders body
+def decode_order_ids(content):
+    return [int(m) for m in ORDER_ID.findall(content)]
+
+
+class ResponseDecoder:
+    """
+    Remembers the last body and decoded value per request key.
+
+    decode() returns (value, changed), where changed means the decoded value
+    differs from the last one. hits counts bodies that matched the previous
+    one byte for byte and were not decoded again.
+    """
+
+    def __init__(self):
+        self.last = {}
+        self.hits = 0
+        self.decodes = 0
+
+    def decode(self, key, content, decoder):
+        last = self.last.get(key)
+        if last is not None and last[0] == content:
+            self.hits += 1
+            return last[1], False
+        value = decoder(content)
+        self.decodes += 1
+        self.last[key] = (content, value)
+        # a body can change (a new bar's tick, someone else's order) without changing the fields we pulled out
+        return value, last is None or value != last[1]
+
+    def stats(self):
+        return {'hits': self.hits, 'decodes': self.decodes}
+
+
+class FastReader:
+    """
+    The reads the strategies make every tick, decoded through a ResponseDecoder.
+
+    Every method returns (value, changed).
+    """
+
+    def __init__(self, client, decoder=None):
+        self.client = client
+        self.decoder = ResponseDecoder() if decoder is None else decoder
+
+    async def _read(self, key, path, params, decoder):
+        resp = await self.client.request('GET', path, params)
+        if not resp.ok:
+            raise ApiException('Response error. %s returned %d.' % (path, resp.status_code))
+        return self.decoder.decode(key, resp.content, decoder)
+
+    async def bid_ask(self, ticker):
+        return await self._read(('book', ticker), '/securities/book', {'ticker': ticker}, decode_bid_ask)
+
+    async def close(self, ticker):
+        return await self._read(('close', ticker), '/securities/history', {'ticker': ticker, 'limit': 1}, decode_close)
+
+    async def position(self, ticker):
+        return await self._read(('position', ticker), '/securities', {'ticker': ticker}, decode_position)
+
+    async def order_ids(self, status='OPEN'):
+        return await self._read(('orders', status), '/orders', {'status': status}, decode_order_ids)
+
+
+# this is the main method, the quote_engine.py ladder polled like alltogether.py but only re-quoted when the close or position changed
+async def main(ticker='ALGO'):
+    async with RitClient() as client:
+        reader = FastReader(client)
+        oms = OrderManager(client)
+        engine = QuoteEngine(client, oms, ticker)
+        skipped = 0
+        tick = await client.get_tick()
+        while tick > 1 and tick < 297 and not shutdown:
+            (close, close_changed), (position, position_changed), tick, reconciled = await asyncio.gather(
+                reader.close(ticker), reader.position(ticker), client.get_tick(), oms.maybe_reconcile())
+            if close_changed or position_changed or reconciled:
+                await engine.update(target_ladder(close, position))
+            else:
+                skipped += 1
+            await asyncio.sleep(POLL)
+        await oms.cancel_all()
+        print(engine.stats())
+        print(dict(reader.decoder.stats(), skipped=skipped))
+
+# this calls the main() method when you type 'python decoding.py' into the command prompt
+if __name__ == '__main__':
+    signal.signal(signal.SIGINT, signal_handler)
+    asyncio.run(main())
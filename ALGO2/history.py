@@ -0,0 +1,200 @@
+# This keeps every bar of the case in NumPy arrays instead of asking for limit=1 each time
+#
+#   history = HistoryManager(client, ['ALGO', 'ALG'])
+#   await history.backfill()             # one request per ticker for everything so far
+#   await history.update(tick)           # then only the bars newer than the last one we have
+#   history['ALGO'].close(), history['ALGO'].volatility(20)
+#
+# Backfill asks /securities/history for the whole case once. After that each update
+# works out how many bars the case has produced since our newest one and asks for
+# those plus our newest one again, which is a limit=2 request once per tick in steady
+# state. That is the one request ticker_close already makes, so the full series costs
+# nothing extra.
+
+import asyncio
+import signal
+
+import numpy as np
+
+from rit_client import ApiException, RitClient
+from tick_scheduler import TickScheduler
+
+FIELDS = ('open', 'high', 'low', 'close')
+# enough for a whole 300 tick period without growing
+CAPACITY = 512
+
+shutdown = False
+
+# this signal handler allows for a graceful shutdown when CTRL+C is pressed
+def signal_handler(signum, frame):
+    global shutdown
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    shutdown = True
+
+
+class TickerHistory:
+    """
+    The bars of one ticker, oldest first, as growable NumPy arrays.
+
+    Accessors return views of the filled part of the arrays, so they are only
+    valid until the next extend().
+    """
+
+    def __init__(self, ticker, capacity=CAPACITY):
+        self.ticker = ticker
+        self.ticks = np.zeros(capacity, dtype=np.int64)
+        self.columns = {name: np.zeros(capacity) for name in FIELDS}
+        self.n = 0
+
+    def __len__(self):
+        return self.n
+
+    @property
+    def last_tick(self):
+        return int(self.ticks[self.n - 1]) if self.n else None
+
+    def _grow(self):
+        capacity = len(self.ticks) * 2
+        ticks = np.zeros(capacity, dtype=np.int64)
+        ticks[:self.n] = self.ticks[:self.n]
+        self.ticks = ticks
+        for name, column in self.columns.items():
+            grown = np.zeros(capacity)
+            grown[:self.n] = column[:self.n]
+            self.columns[name] = grown
+
+    def reset(self):
+        self.n = 0
+
+    # this adds bars from a /securities/history response (newest first), a bar for our newest tick replaces it
+    def extend(self, bars):
+        last = self.last_tick
+        added = 0
+        for bar in reversed(bars):
+            tick = bar['tick']
+            if last is not None and tick < last:
+                continue
+            if last is not None and tick == last:
+                row = self.n - 1
+            else:
+                if self.n == len(self.ticks):
+                    self._grow()
+                row = self.n
+                self.n += 1
+                added += 1
+            self.ticks[row] = tick
+            for name in FIELDS:
+                self.columns[name][row] = bar[name]
+            last = tick
+        return added
+
+    def column(self, name, n=None):
+        start = 0 if n is None else max(0, self.n - n)
+        return self.columns[name][start:self.n]
+
+    def close(self, n=None):
+        return self.column('close', n)
+
+    def last_close(self):
+        if not self.n:
+            raise ApiException('Response error. Unexpected JSON response.')
+        return float(self.columns['close'][self.n - 1])
+
+    # this is the log return of each of the last n bars
+    def returns(self, n=None):
+        closes = self.close(None if n is None else n + 1)
+        return np.diff(np.log(closes)) if len(closes) > 1 else np.zeros(0)
+
+    # this is the standard deviation of the last n bar returns
+    def volatility(self, n=None):
+        returns = self.returns(n)
+        return float(returns.std()) if len(returns) > 1 else 0.0
+
+
+class HistoryManager:
+    """
+    One TickerHistory per ticker kept up to date with as few bars fetched as possible.
+
+    requests and bars_fetched count what it cost, so it can be compared with
+    one limit=1 request per ticker per read.
+    """
+
+    def __init__(self, client, tickers, capacity=CAPACITY):
+        self.client = client
+        self.histories = {t: TickerHistory(t, capacity) for t in tickers}
+        self.tick = None
+        self.requests = 0
+        self.bars_fetched = 0
+
+    def __getitem__(self, ticker):
+        return self.histories[ticker]
+
+    async def _fetch(self, ticker, limit=None):
+        self.requests += 1
+        # requests leaves out a limit of None, which asks for every bar
+        bars = await self.client.get_history(ticker, limit)
+        self.bars_fetched += len(bars)
+        return bars
+
+    # this downloads the whole case so far, one request per ticker
+    async def backfill(self):
+        results = await asyncio.gather(*(self._fetch(t) for t in self.histories))
+        for history, bars in zip(self.histories.values(), results):
+            history.reset()
+            history.extend(bars)
+        return sum(len(h) for h in self.histories.values())
+
+    # this fetches only the bars newer than the newest one we hold, tick is the current case tick if known
+    async def update(self, tick=None):
+        if tick is None:
+            tick = await self.client.get_tick()
+        if self.tick is not None and tick < self.tick:
+            # a new period started, the old bars do not belong to it
+            self.tick = tick
+            return await self.backfill()
+        self.tick = tick
+        jobs = []
+        for history in self.histories.values():
+            last = history.last_tick
+            if last is None:
+                jobs.append((history, None))
+            elif tick - 1 > last:
+                # one extra bar so the newest bar we hold is refreshed if the server revised it
+                jobs.append((history, tick - last))
+        if not jobs:
+            return 0
+        results = await asyncio.gather(*(self._fetch(h.ticker, limit) for h, limit in jobs))
+        return sum(h.extend(bars) for (h, limit), bars in zip(jobs, results))
+
+    # this is a drop-in for client.ticker_close that reads the close from memory
+    def ticker_close(self, ticker):
+        return self.histories[ticker].last_close()
+
+    def stats(self):
+        return {'requests': self.requests, 'bars_fetched': self.bars_fetched,
+                'bars': {t: len(h) for t, h in self.histories.items()}}
+
+
+# this is the main method, it keeps the full history of every ticker and prints a volatility reading each tick
+async def main(tickers=('ALGO', 'ALG', 'ALGOO')):
+    async with RitClient() as client:
+        history = HistoryManager(client, tickers)
+        scheduler = TickScheduler(client, start_tick=2, stop_tick=297)
+        await history.backfill()
+
+        async def on_tick(tick):
+            if shutdown:
+                scheduler.stop()
+                return
+            await history.update(tick)
+            print(tick, ' '.join('%s %.2f vol20 %.4f' % (t, history.ticker_close(t), history[t].volatility(20))
+                                 for t in tickers))
+
+        scheduler.on_tick(on_tick)
+        await scheduler.run()
+        print(history.stats())
+
+# this calls the main() method when you type 'python history.py' into the command prompt
+if __name__ == '__main__':
+    signal.signal(signal.SIGINT, signal_handler)
+    asyncio.run(main())
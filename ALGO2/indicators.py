@@ -0,0 +1,207 @@
+# This is a set of streaming indicators that update in constant time and memory per observation
+#
+#   ind = BookIndicators(window=50, halflife=10)
+#   ind.update(bid, ask, bid_size, ask_size)          # or ind.update_book(depth_book)
+#   ind.mid_ewma.value, ind.volatility.value, ind.spread.value, ind.ofi.value
+#   spread = ind.quote_spread(0.01)                   # instead of SPREAD = 0.01 / 0.02
+#   if ask - bid > ind.scalp_trigger(0.03): ...       # instead of ask - bid > .03
+#
+# Rolling indicators keep their window in a fixed ring and a running sum, so an update
+# is a subtraction and an addition however long the window is. The running sums are
+# recomputed from the ring once per window to stop floating point drift.
+
+import asyncio
+import math
+import signal
+
+from rit_client import RitClient
+from runner import Strategy, StrategyRunner, signal_handler
+
+WINDOW = 50
+HALFLIFE = 10
+# quotes are never tighter than this many standard deviations of the mid's move per update
+VOL_MULTIPLE = 1.0
+
+
+class EWMA:
+    """Exponentially weighted moving average; halflife is in observations."""
+
+    def __init__(self, halflife=HALFLIFE):
+        self.alpha = 1 - 0.5 ** (1 / halflife)
+        self.value = None
+
+    def update(self, x):
+        if self.value is None:
+            self.value = x
+        else:
+            self.value += self.alpha * (x - self.value)
+        return self.value
+
+
+class RollingSum:
+    """Sum and sum of squares over the last `window` observations."""
+
+    def __init__(self, window=WINDOW):
+        self.window = window
+        self.ring = [0.0] * window
+        self.n = 0
+        self.pos = 0
+        self.sum = 0.0
+        self.sum_sq = 0.0
+
+    def update(self, x):
+        old = self.ring[self.pos]
+        self.ring[self.pos] = x
+        self.pos = (self.pos + 1) % self.window
+        if self.n < self.window:
+            self.n += 1
+            self.sum += x
+            self.sum_sq += x * x
+        elif self.pos == 0:
+            # once per window, rebuild the sums so rounding errors do not pile up
+            self.sum = math.fsum(self.ring)
+            self.sum_sq = math.fsum(v * v for v in self.ring)
+        else:
+            self.sum += x - old
+            self.sum_sq += x * x - old * old
+
+    @property
+    def mean(self):
+        return self.sum / self.n if self.n else 0.0
+
+    @property
+    def std(self):
+        if self.n < 2:
+            return 0.0
+        var = (self.sum_sq - self.sum * self.sum / self.n) / (self.n - 1)
+        return math.sqrt(var) if var > 0 else 0.0
+
+
+class RollingMean(RollingSum):
+    @property
+    def value(self):
+        return self.mean
+
+
+class RealizedVolatility:
+    """Standard deviation of the log returns of a price over the last `window` changes."""
+
+    def __init__(self, window=WINDOW):
+        self.returns = RollingSum(window)
+        self.last = None
+
+    def update(self, price):
+        if price is None or price <= 0:
+            return self.value
+        if self.last is not None:
+            self.returns.update(math.log(price / self.last))
+        self.last = price
+        return self.value
+
+    @property
+    def value(self):
+        return self.returns.std
+
+
+class OrderFlowImbalance:
+    """
+    Rolling order flow imbalance from changes at the best bid and ask.
+
+    Each update adds the size that arrived on the bid minus the size that
+    arrived on the ask since the previous update, counting a better price as
+    all of its size arriving and a worse one as the old size leaving.
+    """
+
+    def __init__(self, window=WINDOW):
+        self.flow = RollingSum(window)
+        self.last = None
+
+    def update(self, bid, ask, bid_size, ask_size):
+        if self.last is not None:
+            last_bid, last_ask, last_bid_size, last_ask_size = self.last
+            e = ((bid_size if bid >= last_bid else 0) - (last_bid_size if bid <= last_bid else 0)
+                 - (ask_size if ask <= last_ask else 0) + (last_ask_size if ask >= last_ask else 0))
+            self.flow.update(e)
+        self.last = (bid, ask, bid_size, ask_size)
+        return self.value
+
+    @property
+    def value(self):
+        return self.flow.sum
+
+
+class BookIndicators:
+    """
+    The indicators for one ticker, fed from the top of the book.
+
+    quote_spread() and scalp_trigger() turn them into the numbers the scripts
+    hard-code today, never going below the hard-coded value.
+    """
+
+    def __init__(self, window=WINDOW, halflife=HALFLIFE):
+        self.mid_ewma = EWMA(halflife)
+        self.volatility = RealizedVolatility(window)
+        self.spread = RollingMean(window)
+        self.ofi = OrderFlowImbalance(window)
+        self.updates = 0
+
+    def update(self, bid, ask, bid_size=0, ask_size=0):
+        if bid is None or ask is None:
+            return
+        mid = (bid + ask) / 2
+        self.mid_ewma.update(mid)
+        self.volatility.update(mid)
+        self.spread.update(ask - bid)
+        self.ofi.update(bid, ask, bid_size, ask_size)
+        self.updates += 1
+
+    # this feeds the best level of an order_book.DepthBook
+    def update_book(self, book):
+        bid, bid_size = book.bids.best()
+        ask, ask_size = book.asks.best()
+        if bid is None or ask is None:
+            return
+        self.update(bid / 100, ask / 100, bid_size, ask_size)
+
+    # this is how far from fair value to quote: the base spread, widened when the mid moves more than that
+    def quote_spread(self, base, vol_multiple=VOL_MULTIPLE):
+        mid = self.mid_ewma.value
+        if mid is None:
+            return base
+        return max(base, round(vol_multiple * self.volatility.value * mid, 2))
+
+    # this is how wide the book must be to scalp: the base trigger or the usual spread, whichever is wider
+    def scalp_trigger(self, base):
+        return max(base, self.spread.value)
+
+
+class IndicatorStrategy(Strategy):
+    """Keeps BookIndicators for its tickers up to date and prints them once per tick."""
+
+    def __init__(self, tickers, window=WINDOW, halflife=HALFLIFE):
+        self.tickers = tuple(tickers)
+        self.indicators = {t: BookIndicators(window, halflife) for t in tickers}
+
+    def on_book(self, ctx, ticker, book):
+        self.indicators[ticker].update_book(book)
+
+    def on_tick(self, ctx, tick):
+        for ticker, ind in self.indicators.items():
+            if ind.mid_ewma.value is None:
+                continue
+            print('%d %s mid %.3f vol %.5f spread %.3f ofi %+.0f quote %.2f trigger %.3f' % (
+                tick, ticker, ind.mid_ewma.value, ind.volatility.value, ind.spread.value, ind.ofi.value,
+                ind.quote_spread(0.01), ind.scalp_trigger(0.03)))
+
+
+# this is the main method, it prints the indicators for every ticker once per tick without sending orders
+async def main(tickers=('ALGO', 'ALG', 'ALGOO')):
+    async with RitClient() as client:
+        runner = StrategyRunner(client, [IndicatorStrategy(tickers)])
+        await runner.run()
+
+# this calls the main() method when you type 'python indicators.py' into the command prompt
+if __name__ == '__main__':
+    # the runner owns the shutdown flag, so CTRL+C goes to its handler
+    signal.signal(signal.SIGINT, signal_handler)
+    asyncio.run(main())
@@ -0,0 +1,152 @@
+# This splits the client's connections into lanes so order entry never waits behind market data
+#
+#   orders    POST /orders, /commands/cancel, DELETE /orders/{id}
+#   market    GET /case, /securities, /securities/book, /orders, /trader
+#   history   GET /securities/history
+#
+# Each lane has its own requests.Session (its own keep-alive connections) and as many
+# threads as connections. A request may use a connection in its own lane or in any
+# lane below it, so orders can borrow an idle market or history connection but a
+# history download can never hold a connection orders need. When every connection a
+# request may use is busy it waits in one queue ordered by lane, orders first.
+
+import asyncio
+import functools
+import heapq
+import itertools
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# lane names, highest priority first
+PRIORITY = ['orders', 'market', 'history']
+
+
+# this picks the lane for one request
+def classify(method, path):
+    if method != 'GET':
+        return 'orders'
+    if path.startswith('/securities/history'):
+        return 'history'
+    return 'market'
+
+
+# this splits max_connections over the lanes: half for orders, one for history, the rest for market data
+def lane_sizes(max_connections):
+    if max_connections < len(PRIORITY):
+        raise ValueError('need at least %d connections, one per lane' % len(PRIORITY))
+    orders = max(1, max_connections // 2)
+    history = 1
+    return {'orders': orders, 'market': max_connections - orders - history, 'history': history}
+
+
+class Lane:
+    def __init__(self, name, size, headers):
+        self.name = name
+        self.priority = PRIORITY.index(name)
+        self.size = size
+        self.busy = 0
+        self.session = requests.Session()
+        self.session.headers.update(headers)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.executor = ThreadPoolExecutor(max_workers=size, thread_name_prefix='rit-%s' % name)
+        self.requests = 0
+        self.borrowed = 0
+
+    @property
+    def free(self):
+        return self.busy < self.size
+
+    def close(self):
+        self.executor.shutdown(wait=False)
+        self.session.close()
+
+
+class LanePool:
+    """
+    Connection lanes with one priority queue in front of them.
+
+    A request classified into lane p may run on any lane with priority p or
+    lower, its own lane first. When a connection frees up it goes to the
+    highest priority waiter allowed to use it, oldest first within a lane.
+    """
+
+    def __init__(self, headers, sizes):
+        self.lanes = [Lane(name, sizes[name], headers) for name in PRIORITY]
+        self.waiting = []
+        self.sequence = itertools.count()
+        self.waits = {name: 0 for name in PRIORITY}
+        self.wait_time = {name: 0.0 for name in PRIORITY}
+
+    @property
+    def size(self):
+        return sum(lane.size for lane in self.lanes)
+
+    def _free_lane(self, priority):
+        for lane in self.lanes[priority:]:
+            if lane.free:
+                return lane
+        return None
+
+    async def acquire(self, name):
+        priority = PRIORITY.index(name)
+        # _wake runs on every release, so a free lane here is one no waiter is allowed to use
+        lane = self._free_lane(priority)
+        if lane is not None:
+            lane.busy += 1
+        else:
+            start = time.monotonic()
+            future = asyncio.get_running_loop().create_future()
+            heapq.heappush(self.waiting, (priority, next(self.sequence), future))
+            try:
+                lane = await future
+            except asyncio.CancelledError:
+                if future.done() and not future.cancelled():
+                    self.release(future.result())
+                raise
+            self.waits[name] += 1
+            self.wait_time[name] += time.monotonic() - start
+        lane.requests += 1
+        lane.borrowed += lane.priority != priority
+        return lane
+
+    def release(self, lane):
+        lane.busy -= 1
+        self._wake()
+
+    # this hands free connections to waiters, highest priority first
+    def _wake(self):
+        kept = []
+        while self.waiting:
+            priority, seq, future = heapq.heappop(self.waiting)
+            if future.done():
+                continue
+            lane = self._free_lane(priority)
+            if lane is None:
+                kept.append((priority, seq, future))
+                continue
+            lane.busy += 1
+            future.set_result(lane)
+        self.waiting = kept
+        heapq.heapify(self.waiting)
+
+    async def request(self, method, url, path, params=None):
+        lane = await self.acquire(classify(method, path))
+        try:
+            call = functools.partial(lane.session.request, method, url, params=params)
+            return await asyncio.get_running_loop().run_in_executor(lane.executor, call)
+        finally:
+            self.release(lane)
+
+    def stats(self):
+        return {lane.name: {'size': lane.size, 'requests': lane.requests, 'borrowed': lane.borrowed,
+                            'waits': self.waits[lane.name], 'wait_time': self.wait_time[lane.name]}
+                for lane in self.lanes}
+
+    def close(self):
+        for lane in self.lanes:
+            lane.close()
@@ -0,0 +1,273 @@
+# This publishes one poller's market data to any number of strategy processes through shared memory
+#
+#   python market_bus.py publish --name rit_bus              # the only process talking to RIT
+#   bus = MarketBus.attach('rit_bus')                         # in each strategy process
+#   snap = bus.read('ALGO')                                   # a few microseconds, no request
+#   snap['close'], snap['position'], bus.levels(snap, 'BUY')
+#
+# The segment holds one fixed-size record per ticker: tick, close, position and the
+# best DEPTH price levels on each side. Every record starts with a sequence number
+# the writer makes odd before it changes the record and even again afterwards. A
+# reader copies the record and keeps the copy only if the sequence number was the same
+# even number before and after, so it never sees half of one update and half of
+# another and the writer never waits for readers.
+
+import argparse
+import asyncio
+import signal
+import time
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+from order_book import DepthBook
+from rit_client import RitClient
+
+NAME = 'rit_bus'
+TICKERS = ['ALGO', 'ALG', 'ALGOO']
+DEPTH = 5
+# seconds between polls in the publisher
+INTERVAL = 0.05
+MAGIC = 0x5355424154414452
+VERSION = 1
+# header is 4 int64 slots: magic, version, tickers, depth
+HEADER_SLOTS = 4
+NAME_BYTES = 16
+
+shutdown = False
+
+# this signal handler allows for a graceful shutdown when CTRL+C is pressed
+def signal_handler(signum, frame):
+    global shutdown
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    shutdown = True
+
+
+def record_dtype(depth):
+    return np.dtype([
+        ('seq', np.int64),
+        ('tick', np.int64),
+        ('close', np.float64),
+        ('position', np.int64),
+        ('bid_levels', np.int64),
+        ('ask_levels', np.int64),
+        ('updated', np.float64),
+        ('bids', np.float64, (depth, 2)),
+        ('asks', np.float64, (depth, 2)),
+    ])
+
+
+def _records_offset(n_tickers):
+    offset = HEADER_SLOTS * 8 + n_tickers * NAME_BYTES
+    return offset + -offset % 8
+
+
+class StaleRead(Exception):
+    pass
+
+
+class MarketBus:
+    """
+    One shared memory segment of per-ticker records guarded by seqlocks.
+
+    There must be a single writer. Readers never block it; read() retries
+    while a write is in progress and raises StaleRead if it cannot get a
+    clean copy within `retries` attempts.
+    """
+
+    def __init__(self, shm, tickers, depth, owner):
+        self.shm = shm
+        self.tickers = list(tickers)
+        self.index = {t: i for i, t in enumerate(self.tickers)}
+        self.depth = depth
+        self.owner = owner
+        self.records = np.ndarray((len(self.tickers),), dtype=record_dtype(depth), buffer=shm.buf,
+                                  offset=_records_offset(len(self.tickers)))
+        self.writes = 0
+        self.retries = 0
+
+    # this creates the segment, the publisher calls it once
+    @classmethod
+    def create(cls, name=NAME, tickers=TICKERS, depth=DEPTH):
+        size = _records_offset(len(tickers)) + len(tickers) * record_dtype(depth).itemsize
+        shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        header = np.ndarray((HEADER_SLOTS,), dtype=np.int64, buffer=shm.buf)
+        header[:] = [MAGIC, VERSION, len(tickers), depth]
+        names = np.ndarray((len(tickers),), dtype='S%d' % NAME_BYTES, buffer=shm.buf, offset=HEADER_SLOTS * 8)
+        names[:] = [t.encode() for t in tickers]
+        bus = cls(shm, tickers, depth, owner=True)
+        bus.records[:] = np.zeros(1, dtype=bus.records.dtype)
+        bus.records['close'] = np.nan
+        return bus
+
+    # this opens a segment the publisher created
+    @classmethod
+    def attach(cls, name=NAME):
+        shm = shared_memory.SharedMemory(name=name)
+        # only the creator should unlink the segment, so stop this process's tracker from doing it at exit
+        try:
+            resource_tracker.unregister(shm._name, 'shared_memory')
+        except Exception:
+            pass
+        header = np.ndarray((HEADER_SLOTS,), dtype=np.int64, buffer=shm.buf)
+        if header[0] != MAGIC or header[1] != VERSION:
+            shm.close()
+            raise ValueError('%s is not a market bus' % name)
+        n_tickers, depth = int(header[2]), int(header[3])
+        names = np.ndarray((n_tickers,), dtype='S%d' % NAME_BYTES, buffer=shm.buf, offset=HEADER_SLOTS * 8)
+        return cls(shm, [n.decode() for n in names], depth, owner=False)
+
+    # this writes one ticker's record; bids and asks are (prices, sizes) best first, None leaves a field as it is
+    def publish(self, ticker, tick=None, close=None, position=None, bids=None, asks=None):
+        record = self.records[self.index[ticker]:self.index[ticker] + 1]
+        seq = record['seq']
+        seq += 1
+        if tick is not None:
+            record['tick'] = tick
+        if close is not None:
+            record['close'] = close
+        if position is not None:
+            record['position'] = position
+        for side, levels, count in (('bids', bids, 'bid_levels'), ('asks', asks, 'ask_levels')):
+            if levels is None:
+                continue
+            prices, sizes = levels
+            n = min(len(prices), self.depth)
+            record[side][0, :n, 0] = prices[:n]
+            record[side][0, :n, 1] = sizes[:n]
+            record[count] = n
+        record['updated'] = time.time()
+        seq += 1
+        self.writes += 1
+
+    # this is the sequence number of a ticker's record, it changes on every publish
+    def version(self, ticker):
+        return int(self.records['seq'][self.index[ticker]])
+
+    # this copies one ticker's record consistently and returns it as a NumPy record
+    def read(self, ticker, retries=1000):
+        i = self.index[ticker]
+        seqs = self.records['seq']
+        for attempt in range(retries):
+            before = seqs[i]
+            if before & 1:
+                self.retries += 1
+                continue
+            copy = self.records[i].copy()
+            if seqs[i] == before:
+                return copy
+            self.retries += 1
+        raise StaleRead('could not read %s, the writer kept changing it' % ticker)
+
+    # this returns (prices, sizes) for one side of a record from read()
+    def levels(self, snapshot, action):
+        side, count = ('bids', 'bid_levels') if action == 'BUY' else ('asks', 'ask_levels')
+        n = int(snapshot[count])
+        return snapshot[side][:n, 0], snapshot[side][:n, 1]
+
+    def close(self):
+        self.records = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+class Publisher:
+    """
+    Polls RIT for every ticker on the bus and publishes the results.
+
+    Books and positions are fetched every interval, closes only when the case
+    tick moves, and a record is only rewritten when something in it changed.
+    """
+
+    def __init__(self, client, bus, interval=INTERVAL):
+        self.client = client
+        self.bus = bus
+        self.interval = interval
+        self.books = {t: DepthBook(t) for t in bus.tickers}
+        self.tick = None
+        self.positions = {}
+        self.polls = 0
+
+    async def poll(self):
+        tickers = self.bus.tickers
+        tick, books, securities = await asyncio.gather(
+            self.client.get_tick(),
+            asyncio.gather(*(self.client.get_book(t) for t in tickers)),
+            self.client.get_securities())
+        closes = {}
+        if tick != self.tick:
+            values = await asyncio.gather(*(self.client.ticker_close(t) for t in tickers))
+            closes = dict(zip(tickers, values))
+            self.tick = tick
+        positions = {s['ticker']: s['position'] for s in securities}
+        for ticker, book in zip(tickers, books):
+            depth = self.books[ticker]
+            book_changed = depth.apply_snapshot(book)
+            position = positions.get(ticker)
+            position_changed = position != self.positions.get(ticker)
+            self.positions[ticker] = position
+            if not (book_changed or position_changed or ticker in closes):
+                continue
+            self.bus.publish(ticker, tick=tick, close=closes.get(ticker), position=position,
+                             bids=depth.levels('BUY', self.bus.depth) if book_changed else None,
+                             asks=depth.levels('SELL', self.bus.depth) if book_changed else None)
+        self.polls += 1
+        return tick
+
+    async def run(self, stop_tick=298):
+        while not shutdown:
+            started = time.monotonic()
+            tick = await self.poll()
+            if tick >= stop_tick:
+                break
+            await asyncio.sleep(max(0.0, self.interval - (time.monotonic() - started)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Share one RIT poller with many strategy processes')
+    commands = parser.add_subparsers(dest='command', required=True)
+    publish = commands.add_parser('publish')
+    publish.add_argument('--name', default=NAME)
+    publish.add_argument('--tickers', default=','.join(TICKERS))
+    publish.add_argument('--depth', type=int, default=DEPTH)
+    publish.add_argument('--interval', type=float, default=INTERVAL)
+    watch = commands.add_parser('watch')
+    watch.add_argument('--name', default=NAME)
+    args = parser.parse_args()
+
+    if args.command == 'publish':
+        bus = MarketBus.create(args.name, args.tickers.split(','), args.depth)
+
+        async def run():
+            async with RitClient() as client:
+                publisher = Publisher(client, bus, args.interval)
+                await publisher.run()
+                print('%d polls, %d records written' % (publisher.polls, bus.writes))
+
+        try:
+            asyncio.run(run())
+        finally:
+            bus.close()
+    else:
+        bus = MarketBus.attach(args.name)
+        versions = {}
+        try:
+            while not shutdown:
+                for ticker in bus.tickers:
+                    version = bus.version(ticker)
+                    if version == versions.get(ticker):
+                        continue
+                    versions[ticker] = version
+                    snap = bus.read(ticker)
+                    bids, asks = bus.levels(snap, 'BUY'), bus.levels(snap, 'SELL')
+                    print(ticker, snap['tick'], snap['close'], snap['position'],
+                          bids[0][:1].tolist(), asks[0][:1].tolist())
+                time.sleep(0.1)
+        finally:
+            bus.close()
+
+# this calls the main() method when you type 'python market_bus.py' into the command prompt
+if __name__ == '__main__':
+    signal.signal(signal.SIGINT, signal_handler)
+    main()
@@ -0,0 +1,190 @@
+# This is the latency instrumentation for RIT calls and strategy stages
+#
+#   metrics = Metrics()
+#   client = RitClient(metrics=metrics)          # every request is timed per endpoint
+#   with metrics.stage('quote'): ...             # time a piece of strategy logic
+#   metrics.iteration(tick)                      # count loop iterations per tick
+#   metrics.dump('metrics')                      # writes metrics.json and metrics.csv
+#
+# With Metrics(enabled=False) every call returns straight away.
+
+import csv
+import json
+import math
+import time
+from contextlib import contextmanager
+
+# histogram buckets are spaced this many per factor of 10, which keeps percentiles within about 5%
+BUCKETS_PER_DECADE = 50
+# anything faster than this lands in the first bucket
+MIN_LATENCY = 1e-6
+PERCENTILES = (50, 90, 99)
+
+
+class Histogram:
+    """
+    Log-bucketed latency histogram with constant memory.
+
+    Percentiles are read from the bucket boundaries, so they are approximate,
+    while count, mean, min and max are exact.
+    """
+
+    def __init__(self):
+        self.buckets = {}
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+
+    def add(self, seconds):
+        if seconds < MIN_LATENCY:
+            index = 0
+        else:
+            index = int(math.log10(seconds / MIN_LATENCY) * BUCKETS_PER_DECADE)
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+        self.count += 1
+        self.total += seconds
+        if seconds < self.min:
+            self.min = seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, p):
+        if not self.count:
+            return 0.0
+        rank = math.ceil(self.count * p / 100)
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= rank:
+                upper = MIN_LATENCY * 10 ** ((index + 1) / BUCKETS_PER_DECADE)
+                return min(max(upper, self.min), self.max)
+        return self.max
+
+    def summary(self):
+        out = {'count': self.count, 'mean': self.total / self.count if self.count else 0.0,
+               'min': self.min if self.count else 0.0}
+        for p in PERCENTILES:
+            out['p%d' % p] = self.percentile(p)
+        out['max'] = self.max
+        return out
+
+
+class _NullTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+NULL_TIMER = _NullTimer()
+
+
+class Metrics:
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.endpoints = {}
+        self.stages = {}
+        self.iterations = {}
+        self.started = time.monotonic()
+
+    # this records one request latency under an endpoint name like 'GET /securities/book'
+    def record(self, name, seconds):
+        if not self.enabled:
+            return
+        histogram = self.endpoints.get(name)
+        if histogram is None:
+            histogram = self.endpoints[name] = Histogram()
+        histogram.add(seconds)
+
+    def record_stage(self, name, seconds):
+        if not self.enabled:
+            return
+        histogram = self.stages.get(name)
+        if histogram is None:
+            histogram = self.stages[name] = Histogram()
+        histogram.add(seconds)
+
+    # this times the body of a with block as a strategy stage
+    def stage(self, name):
+        if not self.enabled:
+            return NULL_TIMER
+        return self._stage(name)
+
+    @contextmanager
+    def _stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record_stage(name, time.perf_counter() - start)
+
+    # this counts one pass of the strategy loop against the tick it ran in
+    def iteration(self, tick):
+        if not self.enabled:
+            return
+        self.iterations[tick] = self.iterations.get(tick, 0) + 1
+
+    def iteration_summary(self):
+        counts = list(self.iterations.values())
+        elapsed = time.monotonic() - self.started
+        total = sum(counts)
+        return {
+            'ticks': len(counts),
+            'iterations': total,
+            'per_tick_mean': total / len(counts) if counts else 0.0,
+            'per_tick_min': min(counts) if counts else 0,
+            'per_tick_max': max(counts) if counts else 0,
+            'per_second': total / elapsed if elapsed > 0 else 0.0,
+        }
+
+    def summary(self):
+        return {
+            'endpoints': {name: h.summary() for name, h in sorted(self.endpoints.items())},
+            'stages': {name: h.summary() for name, h in sorted(self.stages.items())},
+            'iterations': self.iteration_summary(),
+            'iterations_by_tick': {str(t): n for t, n in sorted(self.iterations.items())},
+        }
+
+    # this writes <prefix>.json with everything and <prefix>.csv with one row per endpoint and stage
+    def dump(self, prefix='metrics'):
+        if not self.enabled:
+            return None
+        summary = self.summary()
+        with open(prefix + '.json', 'w') as f:
+            json.dump(summary, f, indent=2)
+        columns = ['count', 'mean', 'min'] + ['p%d' % p for p in PERCENTILES] + ['max']
+        with open(prefix + '.csv', 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['kind', 'name'] + columns)
+            for kind in ('endpoints', 'stages'):
+                for name, row in summary[kind].items():
+                    writer.writerow([kind[:-1], name] + [row[c] for c in columns])
+        return summary
+
+
+# this times every request a blocking requests.Session makes, so the original scripts can be measured
+# as is: `instrument_session(s, metrics)` right after `s.headers.update(API_KEY)`
+def instrument_session(session, metrics):
+    send = session.request
+
+    def request(method, url, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return send(method, url, *args, **kwargs)
+        finally:
+            metrics.record(endpoint_name(method, url), time.perf_counter() - start)
+
+    session.request = request
+    return session
+
+
+# this turns 'http://localhost:9999/v1/securities/book?ticker=ALGO' into 'GET /securities/book'
+def endpoint_name(method, url):
+    path = url.split('?', 1)[0]
+    if '/v1' in path:
+        path = path.split('/v1', 1)[1]
+    # order ids are folded together so /orders/17 and /orders/18 share a histogram
+    parts = ['{id}' if p.isdigit() else p for p in path.split('/')]
+    return '%s %s' % (method.upper(), '/'.join(parts))
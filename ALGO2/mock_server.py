@@ -0,0 +1,570 @@
+# This is a local stand-in for the RIT REST API so the ALGO2 scripts can be run and benchmarked offline
+#
+# It serves /v1/case, /v1/trader, /v1/securities, /v1/securities/book, /v1/securities/history,
+# /v1/orders and /v1/commands/cancel on top of an in-memory price-time order book.
+# Orders sent over the API belong to us; synthetic traders add and take liquidity
+# every tick so our resting orders get filled.
+#
+#   python mock_server.py --port 9999 --tick-duration 1.0
+
+import argparse
+import bisect
+import json
+import random
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from accounting import average_cost_fill
+
+TICKERS = {'ALGO': 10.00, 'ALG': 20.00, 'ALGOO': 30.00}
+TICKS_PER_PERIOD = 300
+TRADER_ID = 'TRADER'
+MARKET_ID = 'MARKET'
+
+
+class ApiError(Exception):
+    def __init__(self, status, code, message, **extra):
+        super().__init__(message)
+        self.status = status
+        self.body = dict({'code': code, 'message': message}, **extra)
+
+
+# prices are kept in whole cents so float noise like 9.990000001 never splits a price level
+def to_cents(price):
+    return int(round(float(price) * 100))
+
+
+class OrderBook:
+    """
+    Limit order book for one ticker with price-time priority.
+
+    Each side maps a price in cents to a FIFO queue of resting orders and keeps
+    a sorted list of the prices that have orders on them. version goes up on
+    every change so a rendered book can be reused until the next one.
+    """
+
+    def __init__(self, ticker):
+        self.ticker = ticker
+        self.levels = {'BUY': {}, 'SELL': {}}
+        self.prices = {'BUY': [], 'SELL': []}
+        self.version = 0
+        self.rendered = None
+
+    def best(self, side):
+        prices = self.prices[side]
+        if not prices:
+            return None
+        return prices[-1] if side == 'BUY' else prices[0]
+
+    def _crosses(self, order, price):
+        if order['type'] == 'MARKET':
+            return True
+        if order['action'] == 'BUY':
+            return price <= order['_cents']
+        return price >= order['_cents']
+
+    # this matches an incoming order against the other side and returns (resting, incoming, quantity, cents) fills
+    def match(self, order):
+        fills = []
+        other = 'SELL' if order['action'] == 'BUY' else 'BUY'
+        while order['quantity'] > order['quantity_filled']:
+            price = self.best(other)
+            if price is None or not self._crosses(order, price):
+                break
+            queue = self.levels[other][price]
+            resting = queue[0]
+            quantity = min(order['quantity'] - order['quantity_filled'], resting['quantity'] - resting['quantity_filled'])
+            fills.append((resting, order, quantity, price))
+            self.version += 1
+            for o in (resting, order):
+                o['vwap'] = ((o['vwap'] or 0) * o['quantity_filled'] + price / 100 * quantity) / (o['quantity_filled'] + quantity)
+                o['quantity_filled'] += quantity
+            if resting['quantity_filled'] >= resting['quantity']:
+                resting['status'] = 'TRANSACTED'
+                queue.popleft()
+                if not queue:
+                    self._remove_level(other, price)
+        return fills
+
+    def add(self, order):
+        self.version += 1
+        side = order['action']
+        price = order['_cents']
+        queue = self.levels[side].get(price)
+        if queue is None:
+            queue = self.levels[side][price] = deque()
+            bisect.insort(self.prices[side], price)
+        queue.append(order)
+
+    def remove(self, order):
+        side = order['action']
+        price = order['_cents']
+        queue = self.levels[side].get(price)
+        if queue is None:
+            return
+        try:
+            queue.remove(order)
+        except ValueError:
+            return
+        self.version += 1
+        if not queue:
+            self._remove_level(side, price)
+
+    def _remove_level(self, side, price):
+        del self.levels[side][price]
+        prices = self.prices[side]
+        del prices[bisect.bisect_left(prices, price)]
+
+    # this returns resting orders best price first, in time order within a price
+    def orders(self, side, limit=None):
+        prices = self.prices[side]
+        ordered = reversed(prices) if side == 'BUY' else prices
+        out = []
+        for price in ordered:
+            for o in self.levels[side][price]:
+                out.append(o)
+                if limit is not None and len(out) >= limit:
+                    return out
+        return out
+
+
+class Account:
+    def __init__(self):
+        self.position = 0
+        self.cost = 0.0
+        self.realized = 0.0
+
+    # this applies a fill using average cost accounting
+    def fill(self, action, quantity, price):
+        self.position, self.cost, self.realized = average_cost_fill(
+            self.position, self.cost, self.realized, action, quantity, price)
+
+    def vwap(self):
+        return self.cost / self.position if self.position else 0.0
+
+
+class MockExchange:
+    """
+    In-memory RIT case: clock, order books, bar history and our account.
+
+    api_key is a header dict like {'X-API-Key': '...'}; when it is None any key
+    is accepted so every script works regardless of the key hard-coded in it.
+
+    The clock runs off wall time (tick_duration seconds per tick). With
+    tick_duration=0 it only moves when step() is called, which is what tests
+    and fast replays want.
+
+    order_rate limits POST /v1/orders to that many orders per second the way
+    RIT does, answering 429 with the seconds to wait; None means no limit.
+    """
+
+    def __init__(self, tickers=None, tick_duration=1.0, start_tick=5, ticks_per_period=TICKS_PER_PERIOD,
+                 seed=None, flow_orders=12, flow_takers=2, volatility=0.01, api_key=None, order_rate=None):
+        self.lock = threading.RLock()
+        self.rng = random.Random(seed)
+        self.tickers = dict(tickers or TICKERS)
+        self.tick_duration = tick_duration
+        self.ticks_per_period = ticks_per_period
+        self.flow_orders = flow_orders
+        self.flow_takers = flow_takers
+        self.volatility = volatility
+        self.api_key = api_key
+        self.order_rate = order_rate
+        self.order_allowance = order_rate or 0
+        self.order_checked = 0.0
+        self.tick = 0
+        self.next_order_id = 1
+        self.books = {t: OrderBook(t) for t in self.tickers}
+        self.fair = {t: to_cents(p) for t, p in self.tickers.items()}
+        self.last = dict(self.fair)
+        self.volume = {t: 0 for t in self.tickers}
+        self.bars = {t: [] for t in self.tickers}
+        self.bar = {}
+        self.accounts = {t: Account() for t in self.tickers}
+        self.orders = {}
+        self.open_ids = set()
+        self.request_count = 0
+        for t in range(1, start_tick + 1):
+            self._advance_one()
+        self.started = time.monotonic()
+        self.start_tick = self.tick
+
+    # seconds since the case started, replays override this with a virtual clock
+    def elapsed(self):
+        return time.monotonic() - self.started
+
+    # this catches the case clock up with wall time
+    def sync_clock(self):
+        if not self.tick_duration:
+            return
+        target = self.start_tick + int(self.elapsed() / self.tick_duration)
+        target = min(target, self.ticks_per_period)
+        while self.tick < target:
+            self._advance_one()
+
+    def step(self, ticks=1):
+        with self.lock:
+            for i in range(ticks):
+                if self.tick >= self.ticks_per_period:
+                    break
+                self._advance_one()
+            return self.tick
+
+    def _advance_one(self):
+        if self.tick > 0:
+            for t in self.tickers:
+                bar = self.bar.get(t) or self._open_bar(t)
+                self.bars[t].append(bar)
+        self.tick += 1
+        for t in self.tickers:
+            self.bar[t] = self._open_bar(t)
+            self._synthetic_flow(t)
+
+    def _open_bar(self, ticker):
+        price = self.last[ticker] / 100
+        return {'tick': self.tick, 'open': price, 'high': price, 'low': price, 'close': price}
+
+    def _synthetic_flow(self, ticker):
+        rng = self.rng
+        book = self.books[ticker]
+        self.fair[ticker] = max(1, self.fair[ticker] + int(round(rng.gauss(0, self.volatility * 100))))
+        fair = self.fair[ticker]
+        # market makers refresh their quotes around fair value
+        for o in [o for o in book.orders('BUY') + book.orders('SELL') if o['trader_id'] == MARKET_ID]:
+            if self.tick - o['tick'] > 3:
+                self._cancel(o)
+        for i in range(self.flow_orders):
+            action = 'BUY' if i % 2 == 0 else 'SELL'
+            offset = rng.randint(1, 8)
+            price = fair - offset if action == 'BUY' else fair + offset
+            self._submit(MARKET_ID, ticker, 'LIMIT', rng.randint(1, 10) * 500, action, price / 100)
+        # liquidity takers cross the spread and hit whatever is best, including our quotes
+        for i in range(self.flow_takers):
+            action = rng.choice(('BUY', 'SELL'))
+            self._submit(MARKET_ID, ticker, 'MARKET', rng.randint(1, 6) * 500, action, None)
+
+    def _submit(self, trader_id, ticker, order_type, quantity, action, price):
+        order = {
+            'order_id': self.next_order_id,
+            'period': 1,
+            'tick': self.tick,
+            'trader_id': trader_id,
+            'ticker': ticker,
+            'type': order_type,
+            'quantity': quantity,
+            'action': action,
+            'price': None if price is None else round(float(price), 2),
+            'quantity_filled': 0,
+            'vwap': None,
+            'status': 'OPEN',
+            '_cents': None if price is None else to_cents(price),
+        }
+        self.next_order_id += 1
+        self.orders[order['order_id']] = order
+        book = self.books[ticker]
+        for resting, incoming, quantity, cents in book.match(order):
+            self._on_fill(resting, quantity, cents)
+            self._on_fill(incoming, quantity, cents)
+            self._on_trade(ticker, quantity, cents)
+        if order['quantity_filled'] >= order['quantity']:
+            order['status'] = 'TRANSACTED'
+        elif order['type'] == 'MARKET':
+            # an unfilled remainder of a market order is dropped like in RIT
+            order['status'] = 'TRANSACTED' if order['quantity_filled'] else 'CANCELLED'
+        else:
+            book.add(order)
+            if trader_id == TRADER_ID:
+                self.open_ids.add(order['order_id'])
+        return order
+
+    def _on_fill(self, order, quantity, cents):
+        if order['trader_id'] != TRADER_ID:
+            return
+        self.accounts[order['ticker']].fill(order['action'], quantity, cents / 100)
+        if order['status'] != 'OPEN':
+            self.open_ids.discard(order['order_id'])
+
+    def _on_trade(self, ticker, quantity, cents):
+        price = cents / 100
+        self.last[ticker] = cents
+        self.volume[ticker] += quantity
+        bar = self.bar.get(ticker)
+        if bar is not None:
+            bar['high'] = max(bar['high'], price)
+            bar['low'] = min(bar['low'], price)
+            bar['close'] = price
+
+    def _cancel(self, order):
+        if order['status'] != 'OPEN':
+            return False
+        self.books[order['ticker']].remove(order)
+        order['status'] = 'CANCELLED'
+        self.open_ids.discard(order['order_id'])
+        return True
+
+    def check_key(self, headers):
+        if not self.api_key:
+            return
+        for name, value in self.api_key.items():
+            if headers.get(name) != value:
+                raise ApiError(401, 'UNAUTHORIZED', 'API key mismatch')
+
+    def case(self):
+        status = 'ACTIVE' if self.tick < self.ticks_per_period else 'STOPPED'
+        return {'name': 'ALGO2 (mock)', 'period': 1, 'tick': self.tick, 'ticks_per_period': self.ticks_per_period,
+                'total_periods': 1, 'status': status, 'is_enforce_trading_limits': False}
+
+    def trader(self):
+        nlv = sum(a.realized + a.position * self.last[t] / 100 - a.cost for t, a in self.accounts.items())
+        return {'trader_id': TRADER_ID, 'first_name': 'Mock', 'last_name': 'Trader', 'nlv': nlv}
+
+    def _ticker(self, params, required=True):
+        ticker = params.get('ticker')
+        if ticker is None:
+            if required:
+                raise ApiError(400, 'BAD_REQUEST', 'ticker is required')
+            return None
+        if ticker not in self.books:
+            raise ApiError(400, 'BAD_REQUEST', 'unknown ticker %s' % ticker)
+        return ticker
+
+    def securities(self, params):
+        ticker = self._ticker(params, required=False)
+        out = []
+        for t in ([ticker] if ticker else self.tickers):
+            book = self.books[t]
+            bid = book.best('BUY')
+            ask = book.best('SELL')
+            account = self.accounts[t]
+            last = self.last[t] / 100
+            out.append({
+                'ticker': t, 'type': 'STOCK', 'size': 1, 'position': account.position, 'vwap': account.vwap(),
+                'nlv': account.position * last, 'last': last,
+                'bid': bid / 100 if bid is not None else 0, 'ask': ask / 100 if ask is not None else 0,
+                'volume': self.volume[t], 'realized': account.realized,
+                'unrealized': account.position * last - account.cost, 'is_tradeable': True,
+            })
+        return out
+
+    def book(self, params):
+        ticker = self._ticker(params)
+        limit = int(params.get('limit', 20))
+        book = self.books[ticker]
+        if book.rendered is not None and book.rendered[:2] == (book.version, limit):
+            return book.rendered[2]
+        body = {'bids': [public(o) for o in book.orders('BUY', limit)],
+                'asks': [public(o) for o in book.orders('SELL', limit)]}
+        book.rendered = (book.version, limit, body)
+        return body
+
+    def history(self, params):
+        ticker = self._ticker(params)
+        bars = self.bars[ticker]
+        limit = params.get('limit')
+        newest_first = bars[::-1]
+        if limit is not None:
+            newest_first = newest_first[:int(limit)]
+        return newest_first
+
+    def list_orders(self, params):
+        status = params.get('status', 'OPEN')
+        if status == 'OPEN':
+            ids = sorted(self.open_ids)
+            return [public(self.orders[i]) for i in ids]
+        return [public(o) for o in self.orders.values() if o['trader_id'] == TRADER_ID and o['status'] == status]
+
+    def get_order(self, order_id):
+        order = self.orders.get(order_id)
+        if order is None or order['trader_id'] != TRADER_ID:
+            raise ApiError(404, 'NOT_FOUND', 'order %s not found' % order_id)
+        return public(order)
+
+    def post_order(self, params):
+        ticker = self._ticker(params)
+        if self.tick >= self.ticks_per_period:
+            raise ApiError(400, 'CASE_STOPPED', 'the case is not running')
+        try:
+            quantity = int(float(params['quantity']))
+            action = params['action'].upper()
+            order_type = params.get('type', 'LIMIT').upper()
+            price = float(params['price']) if order_type == 'LIMIT' else None
+        except (KeyError, ValueError):
+            raise ApiError(400, 'BAD_REQUEST', 'ticker, type, quantity, action and price are required')
+        if action not in ('BUY', 'SELL') or order_type not in ('LIMIT', 'MARKET') or quantity <= 0:
+            raise ApiError(400, 'BAD_REQUEST', 'invalid order')
+        return public(self._submit(TRADER_ID, ticker, order_type, quantity, action, price))
+
+    def cancel_order(self, order_id):
+        order = self.orders.get(order_id)
+        if order is None or order['trader_id'] != TRADER_ID:
+            raise ApiError(404, 'NOT_FOUND', 'order %s not found' % order_id)
+        return {'success': self._cancel(order)}
+
+    # this supports all=1, ticker=X and ids=1,2,3 like the RIT bulk cancel command
+    def cancel(self, params):
+        if params.get('all') in ('1', 'true', 'True'):
+            targets = list(self.open_ids)
+        elif params.get('ids'):
+            targets = [int(i) for i in params['ids'].split(',') if i.strip()]
+        elif params.get('ticker'):
+            ticker = self._ticker(params)
+            targets = [i for i in self.open_ids if self.orders[i]['ticker'] == ticker]
+        else:
+            raise ApiError(400, 'BAD_REQUEST', 'one of all, ticker or ids is required')
+        cancelled = []
+        for order_id in targets:
+            order = self.orders.get(order_id)
+            if order is not None and order['trader_id'] == TRADER_ID and self._cancel(order):
+                cancelled.append(order_id)
+        return {'cancelled_order_ids': cancelled}
+
+    # this spends one order from a bucket that refills at order_rate per second
+    def check_rate(self):
+        now = self.elapsed()
+        self.order_allowance = min(self.order_rate, self.order_allowance + (now - self.order_checked) * self.order_rate)
+        self.order_checked = now
+        if self.order_allowance < 1:
+            wait = (1 - self.order_allowance) / self.order_rate
+            raise ApiError(429, 'TOO_MANY_REQUESTS', 'API request was throttled', wait=round(wait, 3))
+        self.order_allowance -= 1
+
+    # this routes one request and returns (status, body)
+    def handle(self, method, path, params, headers):
+        with self.lock:
+            self.request_count += 1
+            try:
+                self.check_key(headers)
+                self.sync_clock()
+                if self.order_rate and method == 'POST' and path == '/v1/orders':
+                    self.check_rate()
+                return 200, self._route(method, path, params)
+            except ApiError as e:
+                return e.status, e.body
+
+    def _route(self, method, path, params):
+        if method == 'GET':
+            if path == '/v1/case':
+                return self.case()
+            if path == '/v1/trader':
+                return self.trader()
+            if path == '/v1/securities':
+                return self.securities(params)
+            if path == '/v1/securities/book':
+                return self.book(params)
+            if path == '/v1/securities/history':
+                return self.history(params)
+            if path == '/v1/orders':
+                return self.list_orders(params)
+            if path.startswith('/v1/orders/'):
+                return self.get_order(parse_id(path))
+        elif method == 'POST':
+            if path == '/v1/orders':
+                return self.post_order(params)
+            if path == '/v1/commands/cancel':
+                return self.cancel(params)
+        elif method == 'DELETE':
+            if path.startswith('/v1/orders/'):
+                return self.cancel_order(parse_id(path))
+        raise ApiError(404, 'NOT_FOUND', '%s %s is not supported' % (method, path))
+
+
+def parse_id(path):
+    try:
+        return int(path.rsplit('/', 1)[1])
+    except ValueError:
+        raise ApiError(400, 'BAD_REQUEST', 'bad order id')
+
+
+# this strips the internal fields before an order is sent over the wire
+def public(order):
+    out = order.copy()
+    del out['_cents']
+    return out
+
+
+class RitRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+    exchange = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _dispatch(self, method):
+        url = urlparse(self.path)
+        params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        length = int(self.headers.get('Content-Length') or 0)
+        if length:
+            body = self.rfile.read(length).decode()
+            params.update({k: v[-1] for k, v in parse_qs(body).items()})
+        status, body = self.exchange.handle(method, url.path, params, self.headers)
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        if status == 429:
+            self.send_header('Retry-After', str(body['wait']))
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        self._dispatch('GET')
+
+    def do_POST(self):
+        self._dispatch('POST')
+
+    def do_DELETE(self):
+        self._dispatch('DELETE')
+
+
+class MockServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, exchange=None, host='127.0.0.1', port=9999):
+        self.exchange = exchange or MockExchange()
+        handler = type('BoundRitRequestHandler', (RitRequestHandler,), {'exchange': self.exchange})
+        super().__init__((host, port), handler)
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return 'http://%s:%d/v1' % (host, port)
+
+
+# this starts a server on a background thread and returns it; call server.shutdown() when done
+# port=0 picks a free port, read it back from server.url
+def serve_in_background(exchange=None, host='127.0.0.1', port=9999):
+    server = MockServer(exchange, host, port)
+    thread = threading.Thread(target=server.serve_forever, name='mock-rit', daemon=True)
+    thread.start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Local stand-in for the RIT REST API')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=9999)
+    parser.add_argument('--tick-duration', type=float, default=1.0, help='seconds per tick')
+    parser.add_argument('--start-tick', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--api-key', default=None, help='reject requests without this X-API-Key (default: accept any)')
+    parser.add_argument('--order-rate', type=float, default=None, help='orders per second before answering 429 (default: no limit)')
+    args = parser.parse_args()
+    api_key = {'X-API-Key': args.api_key} if args.api_key else None
+    exchange = MockExchange(tick_duration=args.tick_duration, start_tick=args.start_tick, seed=args.seed,
+                            api_key=api_key, order_rate=args.order_rate)
+    server = MockServer(exchange, args.host, args.port)
+    print('mock RIT server on %s (tick %d, %.2fs per tick)' % (server.url, exchange.tick, args.tick_duration))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+# this calls the main() method when you type 'python mock_server.py' into the command prompt
+if __name__ == '__main__':
+    main()
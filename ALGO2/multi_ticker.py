@@ -0,0 +1,162 @@
+# This is the MAIN_ALGO3 scalper with one independent asyncio worker per ticker
+#
+# Every ticker gets its own loop on the shared RitClient connection pool, so a slow
+# or sleeping ticker (the sleep(2) after ALGOO) no longer holds up the others.
+
+import asyncio
+import signal
+import time
+
+from metrics import Metrics
+from order_submitter import submit_batch
+from rit_client import RitClient
+from tick_scheduler import TickScheduler
+
+# other settings for the scalper, same as MAIN_ALGO3.py
+SCALP_SPREAD = 0.03
+SCALP_VOLUME = 5000
+POSITION_LIMIT = 15000
+# how many buy_bid/sell_ask pairs go in each time the spread is wide enough
+SCALP_REPEAT = 3
+TICKERS = ['ALGO', 'ALG', 'ALGOO']
+
+shutdown = False
+
+# this signal handler allows for a graceful shutdown when CTRL+C is pressed
+def signal_handler(signum, frame):
+    global shutdown
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    shutdown = True
+
+
+# this picks the scalp volumes from our position like the if/elif chain in MAIN_ALGO3.py
+def scalp_volumes(position):
+    if position >= POSITION_LIMIT:
+        return 0, SCALP_VOLUME
+    if position <= -POSITION_LIMIT:
+        return SCALP_VOLUME, 0
+    return SCALP_VOLUME, SCALP_VOLUME
+
+
+class ScalpWorker:
+    """
+    Scalps one ticker: whenever the spread is wider than SCALP_SPREAD it posts
+    SCALP_REPEAT pairs of orders one cent inside the bid and ask, then waits
+    `cooldown` seconds before looking at this ticker again.
+    """
+
+    def __init__(self, client, ticker, cooldown=0.0, interval=0.0, metrics=None):
+        self.client = client
+        self.metrics = metrics or Metrics(enabled=False)
+        self.ticker = ticker
+        self.cooldown = cooldown
+        self.interval = interval
+        self.decisions = 0
+        self.scalps = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+
+    # this reads the book and position together and posts the scalp orders if the spread is wide
+    async def step(self):
+        start = time.perf_counter()
+        with self.metrics.stage('scalp.read'):
+            (bid, ask), position = await asyncio.gather(
+                self.client.ticker_bid_ask(self.ticker),
+                self.client.get_position(self.ticker),
+            )
+        scalped = False
+        if ask - bid > SCALP_SPREAD:
+            buy_volume, sell_volume = scalp_volumes(position)
+            orders = []
+            for i in range(SCALP_REPEAT):
+                if buy_volume:
+                    orders.append((self.ticker, 'BUY', buy_volume, round(bid + .01, 2)))
+                if sell_volume:
+                    orders.append((self.ticker, 'SELL', sell_volume, round(ask - .01, 2)))
+            with self.metrics.stage('scalp.orders'):
+                await submit_batch(self.client, orders)
+            scalped = True
+            self.scalps += 1
+        latency = time.perf_counter() - start
+        self.decisions += 1
+        self.latency_total += latency
+        self.latency_max = max(self.latency_max, latency)
+        return scalped
+
+    async def run(self, running, current_tick=lambda: None):
+        while running():
+            scalped = await self.step()
+            self.metrics.iteration(current_tick())
+            if scalped and self.cooldown:
+                await asyncio.sleep(self.cooldown)
+            else:
+                await asyncio.sleep(self.interval)
+
+    def stats(self):
+        return {
+            'ticker': self.ticker,
+            'decisions': self.decisions,
+            'scalps': self.scalps,
+            'latency_mean': self.latency_total / self.decisions if self.decisions else 0.0,
+            'latency_max': self.latency_max,
+        }
+
+
+class MultiTickerEngine:
+    """
+    Runs one worker per ticker until the case leaves the trading window,
+    ticks 3 to 297 as in MAIN_ALGO3.py's `while tick > 2 and tick < 298`.
+
+    The case clock is watched by a single TickScheduler, so the workers do not
+    each poll get_tick. A worker that raises stops the whole engine.
+    """
+
+    def __init__(self, client, workers, start_tick=3, stop_tick=298):
+        self.client = client
+        self.workers = list(workers)
+        self.scheduler = TickScheduler(client, start_tick=start_tick, stop_tick=stop_tick)
+
+    def running(self):
+        if shutdown:
+            # the clock has to stop too, otherwise run() waits on it until stop_tick
+            self.scheduler.stop()
+            return False
+        tick = self.scheduler.tick
+        return (self.scheduler.running and tick is not None
+                and self.scheduler.start_tick <= tick < self.scheduler.stop_tick)
+
+    async def run(self):
+        clock = asyncio.ensure_future(self.scheduler.run())
+        # wait for the case to reach the trading window before starting the workers
+        while not clock.done() and not shutdown and (self.scheduler.tick is None or self.scheduler.tick < self.scheduler.start_tick):
+            await asyncio.sleep(self.scheduler.fine_poll)
+        current_tick = lambda: self.scheduler.tick
+        tasks = [asyncio.ensure_future(w.run(self.running, current_tick)) for w in self.workers]
+        try:
+            await asyncio.gather(clock, *tasks)
+        finally:
+            self.scheduler.stop()
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(clock, *tasks, return_exceptions=True)
+
+    def stats(self):
+        return [w.stats() for w in self.workers]
+
+
+# this is the main method, the same strategy as MAIN_ALGO3.py but with the tickers running side by side
+async def main():
+    metrics = Metrics()
+    async with RitClient(max_connections=4 * len(TICKERS), metrics=metrics) as client:
+        workers = [ScalpWorker(client, ticker, cooldown=2.0 if ticker == 'ALGOO' else 0.0, metrics=metrics)
+                   for ticker in TICKERS]
+        engine = MultiTickerEngine(client, workers)
+        await engine.run()
+        for stats in engine.stats():
+            print(stats)
+    metrics.dump('multi_ticker_metrics')
+
+# this calls the main() method when you type 'python multi_ticker.py' into the command prompt
+if __name__ == '__main__':
+    signal.signal(signal.SIGINT, signal_handler)
+    asyncio.run(main())
@@ -0,0 +1,221 @@
+# This is a local order management system that mirrors our RIT orders in memory
+#
+# Every order we submit is recorded by id and updated from POST responses, cancel
+# responses and fill reports. The server's open order list is only downloaded every
+# reconcile_interval seconds to catch fills we were not told about.
+
+import asyncio
+import time
+from dataclasses import dataclass, field
+
+# how often to compare our open orders with GET /v1/orders?status=OPEN
+RECONCILE_INTERVAL = 1.0
+
+
+@dataclass
+class TrackedOrder:
+    order_id: int
+    ticker: str
+    action: str
+    quantity: int
+    price: float
+    filled: int = 0
+    vwap: float = 0.0
+    status: str = 'OPEN'
+    tick: int = None
+    submitted: float = field(default_factory=time.monotonic)
+    # whoever sent the order, set before any fill listener sees it
+    owner: object = None
+
+    @property
+    def remaining(self):
+        return self.quantity - self.filled
+
+    @property
+    def is_open(self):
+        return self.status == 'OPEN'
+
+
+class OrderManager:
+    """
+    In-memory book of our own orders.
+
+    Open-order counts and resting quantity per ticker and side are kept as
+    running totals, so open_count() and exposure() never touch the network.
+    Fill listeners are called with (order, quantity, price) for every fill the
+    manager learns about, whichever way it found out. Open and close listeners
+    are called with the order when it starts and stops resting.
+
+    With adopt=True reconcile() takes over open orders it did not submit, such
+    as ones left by an earlier run. Set it to False when other processes trade
+    the same account, so their orders are never tracked or cancelled here.
+    """
+
+    def __init__(self, client, reconcile_interval=RECONCILE_INTERVAL, adopt=True):
+        self.client = client
+        self.reconcile_interval = reconcile_interval
+        self.adopt = adopt
+        self.orders = {}
+        self.open = {}
+        self.open_by_ticker = {}
+        self.resting = {}
+        self.fill_listeners = []
+        self.open_listeners = []
+        self.close_listeners = []
+        self.last_reconcile = 0.0
+        self.reconciles = 0
+        self.lookup_failures = 0
+
+    # these are the O(1) queries the strategies use instead of downloading the order list
+    def open_count(self, ticker=None):
+        if ticker is None:
+            return len(self.open)
+        return len(self.open_by_ticker.get(ticker, ()))
+
+    def open_orders(self, ticker=None):
+        if ticker is None:
+            return list(self.open.values())
+        return list(self.open_by_ticker.get(ticker, {}).values())
+
+    # this is the unfilled quantity we have resting on one side of a ticker
+    def exposure(self, ticker, action):
+        return self.resting.get((ticker, action), 0)
+
+    # this is resting buys minus resting sells, what our position would move by if everything filled
+    def net_exposure(self, ticker):
+        return self.exposure(ticker, 'BUY') - self.exposure(ticker, 'SELL')
+
+    def on_fill(self, listener):
+        self.fill_listeners.append(listener)
+        return listener
+
+    def on_open(self, listener):
+        self.open_listeners.append(listener)
+        return listener
+
+    def on_close(self, listener):
+        self.close_listeners.append(listener)
+        return listener
+
+    def _add_open(self, order):
+        self.open[order.order_id] = order
+        self.open_by_ticker.setdefault(order.ticker, {})[order.order_id] = order
+        key = (order.ticker, order.action)
+        self.resting[key] = self.resting.get(key, 0) + order.remaining
+        for listener in self.open_listeners:
+            listener(order)
+
+    def _close(self, order, status):
+        if not order.is_open:
+            return
+        order.status = status
+        del self.open[order.order_id]
+        del self.open_by_ticker[order.ticker][order.order_id]
+        self.resting[(order.ticker, order.action)] -= order.remaining
+        for listener in self.close_listeners:
+            listener(order)
+
+    # this applies a fill of `quantity` at `price` to one of our open orders
+    def fill(self, order_id, quantity, price):
+        order = self.orders.get(order_id)
+        if order is None or not order.is_open or quantity <= 0:
+            return
+        quantity = min(quantity, order.remaining)
+        if quantity <= 0:
+            return
+        order.vwap = (order.vwap * order.filled + price * quantity) / (order.filled + quantity)
+        order.filled += quantity
+        self.resting[(order.ticker, order.action)] -= quantity
+        if order.remaining == 0:
+            self._close(order, 'TRANSACTED')
+        for listener in self.fill_listeners:
+            listener(order, quantity, price)
+
+    # this brings our copy of an order up to date with an order JSON from the server
+    def apply(self, data):
+        order = self.orders.get(data['order_id'])
+        if order is None:
+            return self.record(data)
+        filled = data.get('quantity_filled') or 0
+        if filled > order.filled:
+            # the server only gives the average price so back out the price of the new part
+            vwap = data.get('vwap') or data.get('price') or order.price
+            quantity = filled - order.filled
+            price = (vwap * filled - order.vwap * order.filled) / quantity
+            self.fill(order.order_id, quantity, price)
+        if data.get('status', 'OPEN') != 'OPEN':
+            self._close(order, data['status'])
+        return order
+
+    # this records an order JSON (our POST response or one found on reconcile), updating it if we already have it
+    def record(self, data, owner=None):
+        known = self.orders.get(data['order_id'])
+        if known is not None:
+            # reconcile can find an order before its POST response comes back
+            if known.owner is None:
+                known.owner = owner
+            return self.apply(data)
+        order = TrackedOrder(data['order_id'], data['ticker'], data['action'], data['quantity'],
+                             data.get('price'), tick=data.get('tick'), owner=owner)
+        self.orders[order.order_id] = order
+        self._add_open(order)
+        if data.get('quantity_filled') or data.get('status', 'OPEN') != 'OPEN':
+            self.apply(data)
+        return order
+
+    # this submits one order and records it from the POST response
+    async def submit(self, ticker, action, quantity, price, order_type='LIMIT'):
+        resp = await self.client.post_order(ticker, action, quantity, price, order_type)
+        if not resp.ok:
+            return None
+        return self.record(resp.json())
+
+    # this records every accepted order from an order_submitter.BatchResult
+    def record_batch(self, batch, owner=None):
+        return [self.record(r.response, owner) for r in batch.results if r.ok and r.response]
+
+    # this cancels a list of our orders in one request and marks the ones the server confirmed
+    async def cancel(self, ids):
+        ids = [i for i in ids if i in self.open]
+        if not ids:
+            return []
+        resp = await self.client.cancel(ids=ids)
+        cancelled = resp.json().get('cancelled_order_ids', []) if resp.ok else []
+        for order_id in cancelled:
+            order = self.orders.get(order_id)
+            if order is not None:
+                self._close(order, 'CANCELLED')
+        return cancelled
+
+    async def cancel_all(self):
+        return await self.cancel(list(self.open))
+
+    # this reconciles only if reconcile_interval has passed since the last time
+    async def maybe_reconcile(self):
+        if time.monotonic() - self.last_reconcile >= self.reconcile_interval:
+            await self.reconcile()
+            return True
+        return False
+
+    # this downloads the open order list once and fixes up anything that changed behind our back
+    async def reconcile(self):
+        self.last_reconcile = time.monotonic()
+        self.reconciles += 1
+        server = await self.client.get_orders('OPEN')
+        seen = set()
+        for data in server:
+            seen.add(data['order_id'])
+            if self.adopt or data['order_id'] in self.orders:
+                self.apply(data)
+        gone = [order_id for order_id in self.open if order_id not in seen]
+        if not gone:
+            return
+        # orders that left the open list were filled or cancelled, ask for each one to find out which
+        results = await asyncio.gather(*(self.client.get_order(i) for i in gone), return_exceptions=True)
+        for order_id, data in zip(gone, results):
+            if not isinstance(data, dict) or 'order_id' not in data or not data.get('status'):
+                # we could not look it up, so leave it open and ask again on the next reconcile
+                self.lookup_failures += 1
+                continue
+            if data['status'] != 'OPEN':
+                self.apply(data)
@@ -0,0 +1,229 @@
+# This runs strategies as separate worker processes, one per core, and keeps them running
+#
+#   python orchestrator.py                                   # ladder on ALGO, scalper on ALG and on ALGOO
+#   python orchestrator.py ladder:ALGO scalp:ALG scalp:ALGOO:2
+#
+# Each worker is a runner.StrategyRunner with its own RitClient in its own process,
+# pinned to one core where the OS allows it, so indicator math or book parsing in one
+# strategy never holds the GIL another one needs. The parent restarts a worker that
+# dies with an error, up to max_restarts times with a growing delay, tells every
+# worker to stop on CTRL+C, and collects the metrics each worker reports into
+# orchestrator_metrics.json.
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import queue
+import signal
+import time
+from dataclasses import dataclass, field
+
+from metrics import Metrics
+from rit_client import RitClient
+from runner import LadderStrategy, ScalpStrategy, StrategyRunner
+
+MAX_RESTARTS = 3
+# seconds before the first restart of a worker, doubled for every restart after that
+RESTART_DELAY = 1.0
+# seconds between metrics reports from each worker
+REPORT_INTERVAL = 5.0
+SPECS = ['ladder:ALGO', 'scalp:ALG', 'scalp:ALGOO:2']
+
+shutdown = False
+
+# this signal handler allows for a graceful shutdown when CTRL+C is pressed
+def signal_handler(signum, frame):
+    global shutdown
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    shutdown = True
+
+
+@dataclass
+class WorkerSpec:
+    name: str
+    kind: str
+    tickers: list
+    cooldown: float = 0.0
+    cpu: int = None
+    kwargs: dict = field(default_factory=dict)
+
+    # this parses 'kind:TICKER[,TICKER][:cooldown]' as used on the command line
+    @classmethod
+    def parse(cls, text):
+        parts = text.split(':')
+        if len(parts) < 2 or parts[0] not in STRATEGIES:
+            raise ValueError('expected kind:TICKERS[:cooldown] with kind one of %s, got %r' % (sorted(STRATEGIES), text))
+        cooldown = float(parts[2]) if len(parts) > 2 else 0.0
+        return cls(text, parts[0], parts[1].split(','), cooldown)
+
+    def strategies(self):
+        return STRATEGIES[self.kind](self)
+
+
+STRATEGIES = {
+    'ladder': lambda spec: [LadderStrategy(t) for t in spec.tickers],
+    'scalp': lambda spec: [ScalpStrategy(spec.tickers, cooldowns={t: spec.cooldown for t in spec.tickers})],
+}
+
+
+def _pin(cpu):
+    if cpu is not None and hasattr(os, 'sched_setaffinity'):
+        os.sched_setaffinity(0, {cpu})
+
+
+# this is what runs inside each worker process
+def _worker_main(spec, stop, reports, report_interval):
+    # the parent owns CTRL+C and tells us to stop through `stop`
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    _pin(spec.cpu)
+    metrics = Metrics()
+
+    async def run():
+        async with RitClient(metrics=metrics) as client:
+            runner = StrategyRunner(client, spec.strategies(), **spec.kwargs)
+
+            def report(final):
+                reports.put((spec.name, os.getpid(), final, {'runner': runner.stats(), 'metrics': metrics.summary()}))
+
+            async def watch():
+                last = time.monotonic()
+                while True:
+                    await asyncio.sleep(0.1)
+                    if stop.is_set():
+                        runner.scheduler.stop()
+                    if time.monotonic() - last >= report_interval:
+                        report(False)
+                        last = time.monotonic()
+
+            watcher = asyncio.ensure_future(watch())
+            try:
+                await runner.run()
+            finally:
+                watcher.cancel()
+                report(True)
+
+    asyncio.run(run())
+
+
+class Orchestrator:
+    """
+    Starts one process per WorkerSpec and supervises them.
+
+    A worker that exits cleanly is done. One that exits with an error is
+    started again after restart_delay * 2**restarts seconds, until it has
+    been restarted max_restarts times. reports holds the latest metrics
+    each worker sent, keyed by spec name.
+
+    Each worker tracks and cancels only the orders it sent, but positions and
+    P&L are per ticker on the account, so no two workers may share a ticker.
+    """
+
+    def __init__(self, specs, max_restarts=MAX_RESTARTS, restart_delay=RESTART_DELAY, report_interval=REPORT_INTERVAL):
+        self.specs = list(specs)
+        owners = {}
+        for spec in self.specs:
+            for ticker in spec.tickers:
+                if ticker in owners:
+                    raise ValueError('%s is traded by both %s and %s' % (ticker, owners[ticker], spec.name))
+                owners[ticker] = spec.name
+        self.max_restarts = max_restarts
+        self.restart_delay = restart_delay
+        self.report_interval = report_interval
+        self.context = multiprocessing.get_context('spawn')
+        self.stop_event = self.context.Event()
+        self.queue = self.context.Queue()
+        self.processes = {}
+        self.restarts = {}
+        self.restart_at = {}
+        self.exit_codes = {}
+        self.reports = {}
+        cpus = sorted(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else list(range(os.cpu_count() or 1))
+        for i, spec in enumerate(self.specs):
+            if spec.cpu is None:
+                spec.cpu = cpus[i % len(cpus)]
+
+    def _start(self, spec):
+        process = self.context.Process(target=_worker_main, name='worker-%s' % spec.name,
+                                       args=(spec, self.stop_event, self.queue, self.report_interval))
+        process.start()
+        self.processes[spec.name] = process
+
+    def _drain(self):
+        while True:
+            try:
+                name, pid, final, report = self.queue.get_nowait()
+            except queue.Empty:
+                return
+            self.reports[name] = dict(report, pid=pid, final=final)
+
+    # this checks every worker once and restarts the ones that died with an error
+    def supervise(self):
+        now = time.monotonic()
+        for spec in self.specs:
+            process = self.processes.get(spec.name)
+            if spec.name in self.exit_codes:
+                continue
+            if process is None:
+                if now >= self.restart_at.get(spec.name, 0.0) and not self.stop_event.is_set():
+                    self._start(spec)
+                continue
+            if process.is_alive():
+                continue
+            process.join()
+            del self.processes[spec.name]
+            restarts = self.restarts.get(spec.name, 0)
+            if process.exitcode == 0 or self.stop_event.is_set() or restarts >= self.max_restarts:
+                self.exit_codes[spec.name] = process.exitcode
+                continue
+            self.restarts[spec.name] = restarts + 1
+            self.restart_at[spec.name] = now + self.restart_delay * 2 ** restarts
+            print('worker %s exited with %s, restarting in %.1fs' % (spec.name, process.exitcode, self.restart_at[spec.name] - now))
+
+    def run(self, poll=0.2):
+        try:
+            while len(self.exit_codes) < len(self.specs):
+                if shutdown:
+                    self.stop()
+                self.supervise()
+                self._drain()
+                time.sleep(poll)
+        finally:
+            self.stop()
+            for process in self.processes.values():
+                process.join(5.0)
+                if process.is_alive():
+                    process.terminate()
+            self._drain()
+
+    def stop(self):
+        self.stop_event.set()
+
+    def stats(self):
+        return {spec.name: {'cpu': spec.cpu, 'restarts': self.restarts.get(spec.name, 0),
+                            'exit_code': self.exit_codes.get(spec.name), 'report': self.reports.get(spec.name)}
+                for spec in self.specs}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run strategies as supervised worker processes')
+    parser.add_argument('specs', nargs='*', default=SPECS, help='kind:TICKERS[:cooldown], kind is ladder or scalp')
+    parser.add_argument('--max-restarts', type=int, default=MAX_RESTARTS)
+    parser.add_argument('--out', default='orchestrator_metrics.json')
+    args = parser.parse_args()
+
+    orchestrator = Orchestrator([WorkerSpec.parse(s) for s in args.specs], max_restarts=args.max_restarts)
+    orchestrator.run()
+    stats = orchestrator.stats()
+    for name, worker in stats.items():
+        runner = (worker['report'] or {}).get('runner', {})
+        print('%-16s cpu %s  restarts %d  exit %s  book polls %s' % (
+            name, worker['cpu'], worker['restarts'], worker['exit_code'], runner.get('book_polls')))
+    with open(args.out, 'w') as f:
+        json.dump(stats, f, indent=2)
+
+# this calls the main() method when you type 'python orchestrator.py' into the command prompt
+if __name__ == '__main__':
+    signal.signal(signal.SIGINT, signal_handler)
+    main()
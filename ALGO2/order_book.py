@@ -0,0 +1,173 @@
+# This keeps the full depth of a RIT order book instead of just bids[0] and asks[0]
+#
+#   book = DepthBook('ALGO')
+#   book.apply_snapshot(await client.get_book('ALGO'))     # or snapshot.book from rit_client
+#   book.microprice(), book.imbalance(), book.depth('BUY', 3)
+#
+# Each side is a pair of sorted NumPy arrays (price in cents, size) best level first.
+# A new snapshot is diffed against the levels we already hold and only the levels that
+# changed are inserted, resized or removed.
+
+import numpy as np
+
+CAPACITY = 64
+
+
+class BookSide:
+    """
+    One side of the book as sorted arrays, best price at index 0.
+
+    Cumulative size is rebuilt once after a batch of changes, so depth(k) is
+    a single array read.
+    """
+
+    def __init__(self, descending, capacity=CAPACITY):
+        self.descending = descending
+        self.prices = np.zeros(capacity, dtype=np.int64)
+        self.sizes = np.zeros(capacity, dtype=np.int64)
+        self.cumulative = np.zeros(capacity, dtype=np.int64)
+        self.n = 0
+        self.levels = {}
+
+    def _find(self, price):
+        prices = self.prices[:self.n]
+        if self.descending:
+            # searchsorted wants ascending order, so search the negated prices
+            return int(np.searchsorted(-prices, -price))
+        return int(np.searchsorted(prices, price))
+
+    def _grow(self):
+        capacity = len(self.prices) * 2
+        for name in ('prices', 'sizes', 'cumulative'):
+            grown = np.zeros(capacity, dtype=np.int64)
+            grown[:self.n] = getattr(self, name)[:self.n]
+            setattr(self, name, grown)
+
+    # this sets the size at one price level, a size of 0 removes the level
+    def set(self, price, size):
+        current = self.levels.get(price)
+        if current == size or (current is None and size <= 0):
+            return False
+        i = self._find(price)
+        if current is None:
+            if self.n == len(self.prices):
+                self._grow()
+            self.prices[i + 1:self.n + 1] = self.prices[i:self.n]
+            self.sizes[i + 1:self.n + 1] = self.sizes[i:self.n]
+            self.prices[i] = price
+            self.sizes[i] = size
+            self.n += 1
+            self.levels[price] = size
+        elif size <= 0:
+            self.prices[i:self.n - 1] = self.prices[i + 1:self.n]
+            self.sizes[i:self.n - 1] = self.sizes[i + 1:self.n]
+            self.n -= 1
+            del self.levels[price]
+        else:
+            self.sizes[i] = size
+            self.levels[price] = size
+        return True
+
+    def rebuild(self):
+        np.cumsum(self.sizes[:self.n], out=self.cumulative[:self.n])
+
+    def best(self):
+        return (int(self.prices[0]), int(self.sizes[0])) if self.n else (None, 0)
+
+    # this is the total size in the best `levels` price levels
+    def depth(self, levels=1):
+        if not self.n or levels <= 0:
+            return 0
+        return int(self.cumulative[min(levels, self.n) - 1])
+
+    # this is the total size priced within `cents` of the best price
+    def depth_within(self, cents):
+        if not self.n:
+            return 0
+        limit = self.prices[0] - cents if self.descending else self.prices[0] + cents
+        end = self._find(limit - 1 if self.descending else limit + 1)
+        return int(self.cumulative[end - 1]) if end else 0
+
+
+class DepthBook:
+    def __init__(self, ticker, capacity=CAPACITY):
+        self.ticker = ticker
+        self.bids = BookSide(descending=True, capacity=capacity)
+        self.asks = BookSide(descending=False, capacity=capacity)
+        self.updates = 0
+        self.changed_levels = 0
+
+    def side(self, action):
+        return self.bids if action == 'BUY' else self.asks
+
+    # this diffs a /securities/book response against what we hold and applies only the changed levels
+    def apply_snapshot(self, book, exclude_trader=None):
+        changed = 0
+        for side, orders in ((self.bids, book.get('bids', ())), (self.asks, book.get('asks', ()))):
+            side_changed = 0
+            levels = {}
+            for o in orders:
+                if exclude_trader is not None and o.get('trader_id') == exclude_trader:
+                    continue
+                price = int(round(o['price'] * 100))
+                levels[price] = levels.get(price, 0) + int(o['quantity'] - o.get('quantity_filled', 0))
+            for price in [p for p in side.levels if p not in levels]:
+                side_changed += side.set(price, 0)
+            for price, size in levels.items():
+                side_changed += side.set(price, size)
+            if side_changed:
+                side.rebuild()
+            changed += side_changed
+        self.updates += 1
+        self.changed_levels += changed
+        return changed
+
+    # this applies one level change from somewhere other than a snapshot (our own fill, a cancel)
+    def apply_level(self, action, price, size):
+        side = self.side(action)
+        if side.set(int(round(price * 100)), int(size)):
+            side.rebuild()
+
+    def best_bid(self):
+        price, size = self.bids.best()
+        return None if price is None else price / 100
+
+    def best_ask(self):
+        price, size = self.asks.best()
+        return None if price is None else price / 100
+
+    def mid(self):
+        bid, ask = self.bids.best()[0], self.asks.best()[0]
+        if bid is None or ask is None:
+            return None
+        return (bid + ask) / 200
+
+    def spread(self):
+        bid, ask = self.bids.best()[0], self.asks.best()[0]
+        if bid is None or ask is None:
+            return None
+        return (ask - bid) / 100
+
+    # this weights the best bid and ask by the size on the other side, a better fair value than the last close
+    def microprice(self):
+        bid, bid_size = self.bids.best()
+        ask, ask_size = self.asks.best()
+        if bid is None or ask is None or bid_size + ask_size == 0:
+            return None
+        return (bid * ask_size + ask * bid_size) / (bid_size + ask_size) / 100
+
+    # this is (bid size - ask size) / (bid size + ask size) over the best `levels` levels, between -1 and 1
+    def imbalance(self, levels=1):
+        bid_size = self.bids.depth(levels)
+        ask_size = self.asks.depth(levels)
+        if bid_size + ask_size == 0:
+            return 0.0
+        return (bid_size - ask_size) / (bid_size + ask_size)
+
+    def depth(self, action, levels=1):
+        return self.side(action).depth(levels)
+
+    def levels(self, action, count=None):
+        side = self.side(action)
+        n = side.n if count is None else min(count, side.n)
+        return side.prices[:n] / 100, side.sizes[:n]
@@ -0,0 +1,71 @@
+# This is a batch order submitter that sends a whole ladder of limit orders to RIT at once
+
+import asyncio
+import time
+from dataclasses import dataclass, field
+
+
+# the outcome of one order in a batch
+@dataclass
+class OrderResult:
+    ticker: str
+    action: str
+    quantity: int
+    price: float
+    ok: bool
+    status_code: int = None
+    order_id: int = None
+    response: dict = None
+    error: str = None
+
+
+# the outcome of a whole batch plus how long it took to reach the book
+@dataclass
+class BatchResult:
+    results: list = field(default_factory=list)
+    latency: float = 0.0
+
+    @property
+    def order_ids(self):
+        return [r.order_id for r in self.results if r.order_id is not None]
+
+    @property
+    def failed(self):
+        return [r for r in self.results if not r.ok]
+
+
+# this helper method builds a ladder of buy and sell orders around the last price
+# levels is a list of (spread, buy_volume, sell_volume) and each level is posted `repeat` times
+def ladder_orders(ticker, last, levels, repeat=1):
+    orders = []
+    for spread, buy_volume, sell_volume in levels:
+        for i in range(repeat):
+            if buy_volume > 0:
+                orders.append((ticker, 'BUY', buy_volume, round(last - spread, 2)))
+            if sell_volume > 0:
+                orders.append((ticker, 'SELL', sell_volume, round(last + spread, 2)))
+    return orders
+
+
+async def _submit_one(client, limit, order):
+    ticker, action, quantity, price = order
+    async with limit:
+        try:
+            resp = await client.post_order(ticker, action, quantity, price)
+        except Exception as e:
+            return OrderResult(ticker, action, quantity, price, False, error=str(e))
+    try:
+        body = resp.json()
+    except ValueError:
+        body = None
+    order_id = body.get('order_id') if isinstance(body, dict) else None
+    error = None if resp.ok else (body.get('message') if isinstance(body, dict) else resp.text)
+    return OrderResult(ticker, action, quantity, price, resp.ok, resp.status_code, order_id, body, error)
+
+
+# this sends every (ticker, action, quantity, price) order concurrently over at most max_in_flight connections
+async def submit_batch(client, orders, max_in_flight=None):
+    limit = asyncio.Semaphore(max_in_flight or client.max_connections)
+    start = time.perf_counter()
+    results = await asyncio.gather(*(_submit_one(client, limit, order) for order in orders))
+    return BatchResult(list(results), time.perf_counter() - start)
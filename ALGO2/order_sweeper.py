@@ -0,0 +1,241 @@
+# This cancels our resting orders that are too old or too far from the market, in the background
+#
+#   index = OrderAgeIndex(oms)
+#   sweeper = OrderSweeper(oms, index, ttl=3.0, max_distance=0.10, mid_fn=book_mid)
+#   sweeper.start()            # runs next to the quoting loop until sweeper.stop()
+#
+# The index follows the OrderManager's open and close events, so finding the stale
+# orders is a walk from the oldest end and finding the far ones is a bisect into
+# prices sorted per ticker and side. Every sweep cancels what it found in a few
+# bulk /commands/cancel?ids=... requests instead of one request per order.
+
+import asyncio
+import bisect
+import inspect
+import signal
+import time
+from collections import OrderedDict
+
+from oms import OrderManager
+from order_submitter import submit_batch
+from quote_engine import target_ladder, to_cents
+from rit_client import ApiException, RitClient
+from tick_scheduler import TickScheduler
+
+# seconds an order may rest before it is cancelled
+TTL = 3.0
+# orders priced further than this from the mid are cancelled, None turns the check off
+MAX_DISTANCE = 0.10
+# seconds between sweeps
+INTERVAL = 0.25
+# order ids per cancel request
+BATCH_SIZE = 50
+
+shutdown = False
+
+# this signal handler allows for a graceful shutdown when CTRL+C is pressed
+def signal_handler(signum, frame):
+    global shutdown
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    shutdown = True
+
+
+class OrderAgeIndex:
+    """
+    Our open orders by age and by price, kept in step with an OrderManager.
+
+    Orders are kept oldest first, and each (ticker, action) has a list of
+    (price in cents, order_id) kept sorted, so stale() only looks at the
+    orders it returns and far() is a bisect per side.
+    """
+
+    def __init__(self, oms):
+        self.by_age = OrderedDict()
+        self.by_price = {}
+        for order in sorted(oms.open_orders(), key=lambda o: o.submitted):
+            self.add(order)
+        oms.on_open(self.add)
+        oms.on_close(self.remove)
+
+    def __len__(self):
+        return len(self.by_age)
+
+    def add(self, order):
+        if order.order_id in self.by_age or order.price is None:
+            return
+        self.by_age[order.order_id] = order
+        bisect.insort(self.by_price.setdefault((order.ticker, order.action), []),
+                      (to_cents(order.price), order.order_id))
+
+    def remove(self, order):
+        if self.by_age.pop(order.order_id, None) is None:
+            return
+        prices = self.by_price[(order.ticker, order.action)]
+        entry = (to_cents(order.price), order.order_id)
+        i = bisect.bisect_left(prices, entry)
+        if i < len(prices) and prices[i] == entry:
+            del prices[i]
+
+    # this returns the ids of orders submitted more than ttl seconds before now, oldest first
+    def stale(self, ttl, now=None):
+        cutoff = (time.monotonic() if now is None else now) - ttl
+        ids = []
+        for order_id, order in self.by_age.items():
+            if order.submitted > cutoff:
+                break
+            ids.append(order_id)
+        return ids
+
+    # this returns the ids of orders in one ticker priced more than distance away from mid
+    def far(self, ticker, mid, distance):
+        buys = self.by_price.get((ticker, 'BUY'), [])
+        sells = self.by_price.get((ticker, 'SELL'), [])
+        low = to_cents(mid - distance)
+        high = to_cents(mid + distance)
+        # buys below low sort before (low, -1), sells above high sort after (high, inf)
+        ids = [order_id for cents, order_id in buys[:bisect.bisect_left(buys, (low, -1))]]
+        ids += [order_id for cents, order_id in sells[bisect.bisect_right(sells, (high, float('inf'))):]]
+        return ids
+
+
+class OrderSweeper:
+    """
+    Background task that cancels stale and far-away orders in bulk.
+
+    mid_fn(ticker) returns the current mid, or a coroutine that does, or None
+    when there is no market to measure against. Each sweep also lets the
+    OrderManager reconcile if it is due. The sweep runs as its own
+    asyncio task, so the quoting loop only shares the event loop with it and
+    never waits for its cancels.
+    """
+
+    def __init__(self, oms, index=None, ttl=TTL, max_distance=MAX_DISTANCE, interval=INTERVAL,
+                 mid_fn=None, batch_size=BATCH_SIZE):
+        self.oms = oms
+        self.index = OrderAgeIndex(oms) if index is None else index
+        self.ttl = ttl
+        self.max_distance = max_distance
+        self.interval = interval
+        self.mid_fn = mid_fn
+        self.batch_size = batch_size
+        self.task = None
+        self.sweeps = 0
+        self.stale_found = 0
+        self.far_found = 0
+        self.cancelled = 0
+        self.cancel_requests = 0
+        self.errors = 0
+
+    async def _mid(self, ticker):
+        mid = self.mid_fn(ticker)
+        if inspect.isawaitable(mid):
+            mid = await mid
+        return mid
+
+    # this finds every order that should go, stale ones first, without duplicates
+    async def collect(self, now=None):
+        ids = dict.fromkeys(self.index.stale(self.ttl, now) if self.ttl is not None else ())
+        self.stale_found += len(ids)
+        if self.max_distance is not None and self.mid_fn is not None:
+            tickers = sorted({ticker for ticker, action in self.index.by_price})
+            mids = await asyncio.gather(*(self._mid(t) for t in tickers), return_exceptions=True)
+            for ticker, mid in zip(tickers, mids):
+                if mid is None or isinstance(mid, Exception):
+                    continue
+                far = [i for i in self.index.far(ticker, mid, self.max_distance) if i not in ids]
+                self.far_found += len(far)
+                ids.update(dict.fromkeys(far))
+        return list(ids)
+
+    # this runs one sweep and returns the ids the server confirmed as cancelled
+    async def sweep(self, now=None):
+        self.sweeps += 1
+        # orders that filled behind our back would otherwise look stale forever
+        await self.oms.maybe_reconcile()
+        ids = await self.collect(now)
+        if not ids:
+            return []
+        batches = [ids[i:i + self.batch_size] for i in range(0, len(ids), self.batch_size)]
+        self.cancel_requests += len(batches)
+        results = await asyncio.gather(*(self.oms.cancel(b) for b in batches), return_exceptions=True)
+        cancelled = []
+        for result in results:
+            if isinstance(result, Exception):
+                self.errors += 1
+            else:
+                cancelled += result
+        self.cancelled += len(cancelled)
+        return cancelled
+
+    async def run(self):
+        while True:
+            started = time.monotonic()
+            try:
+                await self.sweep()
+            except ApiException:
+                raise
+            except Exception:
+                self.errors += 1
+            await asyncio.sleep(max(0.0, self.interval - (time.monotonic() - started)))
+
+    def start(self):
+        if self.task is None:
+            self.task = asyncio.ensure_future(self.run())
+        return self.task
+
+    async def stop(self):
+        if self.task is None:
+            return
+        self.task.cancel()
+        try:
+            await self.task
+        except asyncio.CancelledError:
+            pass
+        self.task = None
+
+    def stats(self):
+        return {
+            'sweeps': self.sweeps,
+            'open': len(self.index),
+            'stale_found': self.stale_found,
+            'far_found': self.far_found,
+            'cancelled': self.cancelled,
+            'cancel_requests': self.cancel_requests,
+            'errors': self.errors,
+        }
+
+
+# this is the main method, the alltogether.py ladder sent every tick without cancelling and left to the sweeper
+async def main(ticker='ALGO'):
+    async with RitClient() as client:
+        oms = OrderManager(client)
+
+        async def mid(t):
+            bid, ask = await client.ticker_bid_ask(t)
+            return (bid + ask) / 2
+
+        sweeper = OrderSweeper(oms, mid_fn=mid)
+        scheduler = TickScheduler(client, start_tick=2, stop_tick=297)
+
+        async def on_tick(tick):
+            if shutdown:
+                scheduler.stop()
+                return
+            close, position = await asyncio.gather(client.ticker_close(ticker), client.get_position(ticker))
+            orders = [(ticker, action, qty, cents / 100)
+                      for (action, cents), qty in target_ladder(close, position).items()]
+            oms.record_batch(await submit_batch(client, orders))
+
+        scheduler.on_tick(on_tick)
+        sweeper.start()
+        try:
+            await scheduler.run()
+        finally:
+            await sweeper.stop()
+        await oms.cancel_all()
+        print(sweeper.stats())
+
+# this calls the main() method when you type 'python order_sweeper.py' into the command prompt
+if __name__ == '__main__':
+    signal.signal(signal.SIGINT, signal_handler)
+    asyncio.run(main())
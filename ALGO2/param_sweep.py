@@ -0,0 +1,160 @@
+# This sweeps the alltogether.py ladder settings over recorded cases and ranks them by P&L
+#
+#   python param_sweep.py case1.jsonl case2.jsonl --ticker ALGO --top 20 --out sweep.csv
+#
+# Every combination of spreads, level volumes, skewed volumes and position cutoffs
+# in GRID is simulated over every recording. The simulation loops over ticks but
+# handles all combinations at once as NumPy arrays, and the combinations are split
+# into chunks that run on a process pool across all cores.
+#
+# The fill model is deliberately simple: each tick the ladder is quoted around the
+# last close, a buy fills in full if the next bar trades below its price and a sell
+# fills in full if the next bar trades above it, and anything unfilled is cancelled.
+
+import argparse
+import csv
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from replay import load_recording
+
+MAX_LEVELS = 5
+# the values alltogether.py and MAIN_ALGO3.py picked by hand are all in here
+GRID = {
+    'spread': [0.01, 0.02, 0.03],            # SPREAD1, distance of the first level from the close
+    'spread_step': [0.01, 0.02],             # SPREAD2 - SPREAD1, SPREAD3 - SPREAD2, ...
+    'levels': [1, 2, 3, 4, 5],
+    'volume': [150, 350, 500, 750, 1000, 1250],   # BUY/SELL_VOLUME at the first level when flat
+    'volume_step': [0, 150, 250],            # extra volume per level further out
+    'light_volume': [0, 10, 150],            # volume on the side that would add to a big position
+    'heavy_volume': [500, 1000],             # volume on the side that reduces it
+    'limit': [5000, 10000, 15000, 20000],    # the +/-10000 and +/-15000 position cutoffs
+}
+CHUNK_SIZE = 2048
+
+
+# this flattens GRID into one array per parameter, one entry per combination
+def build_grid(grid=GRID):
+    names = list(grid)
+    combos = np.array(list(itertools.product(*(grid[n] for n in names))), dtype=np.float64)
+    return {name: combos[:, i] for i, name in enumerate(names)}
+
+
+# this pulls the bar series for one ticker out of a recording
+def load_bars(path, ticker):
+    header, frames = load_recording(path)
+    bars = {}
+    for tick in sorted(frames):
+        bar = frames[tick]['tickers'].get(ticker, {}).get('bar')
+        if bar:
+            bars[bar['tick']] = bar
+    ticks = sorted(bars)
+    return {
+        'close': np.array([bars[t]['close'] for t in ticks]),
+        'high': np.array([bars[t]['high'] for t in ticks]),
+        'low': np.array([bars[t]['low'] for t in ticks]),
+    }
+
+
+# this simulates every combination in params over one bar series and returns per-combination results
+def simulate(bars, params):
+    close, high, low = bars['close'], bars['high'], bars['low']
+    n = len(params['spread'])
+    level = np.arange(MAX_LEVELS)
+    offsets = params['spread'][:, None] + params['spread_step'][:, None] * level
+    active = level < params['levels'][:, None]
+    normal = (params['volume'][:, None] + params['volume_step'][:, None] * level) * active
+    light = params['light_volume'][:, None] * active
+    heavy = params['heavy_volume'][:, None] * active
+    limit = params['limit']
+
+    position = np.zeros(n)
+    cash = np.zeros(n)
+    traded = np.zeros(n)
+    max_position = np.zeros(n)
+    for t in range(len(close) - 1):
+        long = (position > limit)[:, None]
+        short = (position < -limit)[:, None]
+        buy_volume = np.where(long, light, np.where(short, heavy, normal))
+        sell_volume = np.where(short, light, np.where(long, heavy, normal))
+        buy_price = close[t] - offsets
+        sell_price = close[t] + offsets
+        bought = buy_volume * (low[t + 1] < buy_price)
+        sold = sell_volume * (high[t + 1] > sell_price)
+        position += bought.sum(axis=1) - sold.sum(axis=1)
+        cash += (sold * sell_price).sum(axis=1) - (bought * buy_price).sum(axis=1)
+        traded += bought.sum(axis=1) + sold.sum(axis=1)
+        np.maximum(max_position, np.abs(position), out=max_position)
+    pnl = cash + position * close[-1] if len(close) else cash
+    return {'pnl': pnl, 'final_position': position, 'max_position': max_position, 'traded': traded}
+
+
+def _run_chunk(job):
+    bars, params = job
+    return simulate(bars, params)
+
+
+# this runs every chunk of every recording on a process pool and averages the results per combination
+def sweep(paths, ticker, grid=GRID, workers=None, chunk_size=CHUNK_SIZE):
+    params = build_grid(grid)
+    n = len(params['spread'])
+    series = [load_bars(p, ticker) for p in paths]
+    chunks = [(start, min(start + chunk_size, n)) for start in range(0, n, chunk_size)]
+    spans = [(a, b) for bars in series for a, b in chunks]
+    jobs = [(bars, {k: v[a:b] for k, v in params.items()}) for bars in series for a, b in chunks]
+    totals = {k: np.zeros(n) for k in ('pnl', 'final_position', 'max_position', 'traded')}
+    worst = np.full(n, np.inf)
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        for (a, b), result in zip(spans, pool.map(_run_chunk, jobs)):
+            for k in totals:
+                totals[k][a:b] += result[k]
+            worst[a:b] = np.minimum(worst[a:b], result['pnl'])
+    results = dict(params)
+    for k, v in totals.items():
+        results[k] = v / len(series)
+    results['worst_pnl'] = worst
+    return results
+
+
+# this returns the row indexes of the best combinations, best first
+def rank(results, top=20, position_penalty=0.0):
+    score = results['pnl'] - position_penalty * results['max_position']
+    order = np.argsort(-score, kind='stable')
+    return order[:top], score
+
+
+def write_csv(path, results, rows, score):
+    columns = list(GRID) + ['pnl', 'worst_pnl', 'final_position', 'max_position', 'traded']
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['rank', 'score'] + columns)
+        for i, row in enumerate(rows, 1):
+            writer.writerow([i, score[row]] + [results[c][row] for c in columns])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Rank ladder settings over recorded cases')
+    parser.add_argument('recordings', nargs='+', help='files written by replay.py record')
+    parser.add_argument('--ticker', default='ALGO')
+    parser.add_argument('--top', type=int, default=20)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--position-penalty', type=float, default=0.0,
+                        help='P&L charged per share of the largest position held')
+    parser.add_argument('--out', default=None, help='write the ranked rows to this CSV file')
+    args = parser.parse_args()
+
+    results = sweep(args.recordings, args.ticker, workers=args.workers)
+    rows, score = rank(results, len(results['pnl']) if args.out else args.top, args.position_penalty)
+    print('%d combinations over %d recordings' % (len(score), len(args.recordings)))
+    for i, row in enumerate(rows[:args.top], 1):
+        settings = ', '.join('%s=%g' % (name, results[name][row]) for name in GRID)
+        print('%3d  pnl %10.2f  max position %7d  %s' % (i, results['pnl'][row], results['max_position'][row], settings))
+    if args.out:
+        write_csv(args.out, results, rows, score)
+
+# this calls the main() method when you type 'python param_sweep.py' into the command prompt
+if __name__ == '__main__':
+    main()
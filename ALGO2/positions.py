@@ -0,0 +1,175 @@
+# This keeps our position and P&L per ticker in memory, updated from our own fills
+#
+#   tracker = PositionTracker(oms)
+#   tracker.position('ALGO')              # no request, unlike GET /v1/securities?ticker=ALGO
+#   tracker.mark('ALGO', close)
+#   tracker.unrealized('ALGO'), tracker.realized('ALGO')
+#
+# The tracker listens to the OrderManager's fills and uses the same average cost
+# accounting as RIT. Every reconcile_interval seconds it lets the OrderManager pick
+# up fills it missed and then checks every position against one GET /v1/securities,
+# adopting the server's numbers if they disagree.
+
+import asyncio
+import signal
+import time
+from dataclasses import dataclass
+
+from accounting import average_cost_fill
+from oms import OrderManager
+from quote_engine import QuoteEngine, target_ladder
+from rit_client import RitClient
+from tick_scheduler import TickScheduler
+
+# how often to compare our positions with GET /v1/securities
+RECONCILE_INTERVAL = 1.0
+
+shutdown = False
+
+# this signal handler allows for a graceful shutdown when CTRL+C is pressed
+def signal_handler(signum, frame):
+    global shutdown
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    shutdown = True
+
+
+@dataclass
+class Position:
+    ticker: str
+    position: int = 0
+    cost: float = 0.0
+    realized: float = 0.0
+    last: float = None
+
+    @property
+    def vwap(self):
+        return self.cost / self.position if self.position else 0.0
+
+    @property
+    def unrealized(self):
+        if self.last is None:
+            return 0.0
+        return self.position * self.last - self.cost
+
+    # this applies a fill using average cost accounting, the same way RIT reports realized P&L
+    def fill(self, action, quantity, price):
+        self.position, self.cost, self.realized = average_cost_fill(
+            self.position, self.cost, self.realized, action, quantity, price)
+
+
+class PositionTracker:
+    """
+    Positions and P&L per ticker, updated from OrderManager fills.
+
+    Reads never touch the network. reconcile() is the only method that does,
+    and drift counts how many times the server disagreed with us. When tickers
+    is given only those positions are taken from the server, so a process
+    trading some of the account's tickers does not report the others' P&L.
+    """
+
+    def __init__(self, oms, client=None, reconcile_interval=RECONCILE_INTERVAL, tickers=None):
+        self.oms = oms
+        self.client = oms.client if client is None else client
+        self.reconcile_interval = reconcile_interval
+        self.tickers = None if tickers is None else set(tickers)
+        self.positions = {}
+        self.fills = 0
+        self.last_reconcile = 0.0
+        self.reconciles = 0
+        self.drift = 0
+        oms.on_fill(self._on_fill)
+
+    def get(self, ticker):
+        pos = self.positions.get(ticker)
+        if pos is None:
+            pos = self.positions[ticker] = Position(ticker)
+        return pos
+
+    def _on_fill(self, order, quantity, price):
+        self.fills += 1
+        self.get(order.ticker).fill(order.action, quantity, price)
+
+    def position(self, ticker):
+        pos = self.positions.get(ticker)
+        return pos.position if pos else 0
+
+    def vwap(self, ticker):
+        return self.get(ticker).vwap
+
+    # this sets the price unrealized P&L is measured against, usually the last close or the mid
+    def mark(self, ticker, price):
+        self.get(ticker).last = price
+
+    def realized(self, ticker=None):
+        if ticker is None:
+            return sum(p.realized for p in self.positions.values())
+        return self.get(ticker).realized
+
+    def unrealized(self, ticker=None):
+        if ticker is None:
+            return sum(p.unrealized for p in self.positions.values())
+        return self.get(ticker).unrealized
+
+    def pnl(self, ticker=None):
+        return self.realized(ticker) + self.unrealized(ticker)
+
+    # this reconciles only if reconcile_interval has passed since the last time
+    async def maybe_reconcile(self):
+        if time.monotonic() - self.last_reconcile >= self.reconcile_interval:
+            await self.reconcile()
+            return True
+        return False
+
+    # this catches up on missed fills through the OrderManager, then checks what is left against the server
+    async def reconcile(self):
+        self.last_reconcile = time.monotonic()
+        self.reconciles += 1
+        await self.oms.reconcile()
+        for security in await self.client.get_securities():
+            if self.tickers is not None and security['ticker'] not in self.tickers:
+                continue
+            pos = self.get(security['ticker'])
+            if pos.position != security['position']:
+                self.drift += 1
+                pos.position = security['position']
+            # fills reach us out of order, so take the server's cost basis and realized P&L as well
+            pos.cost = security.get('vwap', pos.vwap) * pos.position
+            pos.realized = security.get('realized', pos.realized)
+
+    def stats(self):
+        return {
+            'fills': self.fills,
+            'reconciles': self.reconciles,
+            'drift': self.drift,
+            'realized': self.realized(),
+            'unrealized': self.unrealized(),
+        }
+
+
+# this is the main method, the alltogether.py ladder with the position read from memory instead of once per level
+async def main(ticker='ALGO'):
+    async with RitClient() as client:
+        oms = OrderManager(client)
+        tracker = PositionTracker(oms)
+        engine = QuoteEngine(client, oms, ticker)
+        scheduler = TickScheduler(client, start_tick=2, stop_tick=297)
+        await tracker.reconcile()
+
+        async def on_tick(tick):
+            if shutdown:
+                scheduler.stop()
+                return
+            close, reconciled = await asyncio.gather(client.ticker_close(ticker), tracker.maybe_reconcile())
+            tracker.mark(ticker, close)
+            await engine.update(target_ladder(close, tracker.position(ticker)))
+
+        scheduler.on_tick(on_tick)
+        await scheduler.run()
+        await oms.cancel_all()
+        print(engine.stats())
+        print(tracker.stats())
+
+# this calls the main() method when you type 'python positions.py' into the command prompt
+if __name__ == '__main__':
+    signal.signal(signal.SIGINT, signal_handler)
+    asyncio.run(main())
@@ -0,0 +1,163 @@
+# This is a quoting engine that only sends the orders needed to move our resting ladder to a target
+#
+# The strategy says what it wants resting (price levels and sizes on each side) and the
+# engine compares that with the orders the OrderManager says are resting. Levels we no
+# longer want are cancelled in one bulk request, missing size is topped up with new
+# orders, and levels that already match are left alone so they keep their queue spot.
+
+import asyncio
+import signal
+
+from oms import OrderManager
+from order_submitter import submit_batch
+from rit_client import RitClient
+from tick_scheduler import TickScheduler
+
+# (spread from fair value, volume) per level when our position is inside the limit, from alltogether.py
+LEVELS = [(0.01, 350), (0.02, 500), (0.03, 750), (0.04, 1000), (0.05, 1250)]
+POSITION_LIMIT = 10000
+# past the limit the side that adds to the position drops to LIGHT_VOLUME and the side that unwinds it goes to HEAVY_VOLUME
+LIGHT_VOLUME = 10
+HEAVY_VOLUME = 500
+# resting size within this many shares of the target is left alone
+TOLERANCE = 0
+
+shutdown = False
+
+# this signal handler allows for a graceful shutdown when CTRL+C is pressed
+def signal_handler(signum, frame):
+    global shutdown
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    shutdown = True
+
+
+def to_cents(price):
+    return int(round(price * 100))
+
+
+# this builds the target ladder {(action, price in cents): quantity} around a fair value, skewed by position
+def target_ladder(fair, position, levels=LEVELS, limit=POSITION_LIMIT, light_volume=LIGHT_VOLUME, heavy_volume=HEAVY_VOLUME):
+    target = {}
+    for spread, volume in levels:
+        if position > limit:
+            buy_volume, sell_volume = light_volume, heavy_volume
+        elif position < -limit:
+            buy_volume, sell_volume = heavy_volume, light_volume
+        else:
+            buy_volume, sell_volume = volume, volume
+        if buy_volume > 0:
+            key = ('BUY', to_cents(fair - spread))
+            target[key] = target.get(key, 0) + buy_volume
+        if sell_volume > 0:
+            key = ('SELL', to_cents(fair + spread))
+            target[key] = target.get(key, 0) + sell_volume
+    return target
+
+
+class QuoteEngine:
+    """
+    Moves the orders resting in one ticker to a target ladder with as little
+    order traffic as possible.
+
+    Within a level, orders are cancelled newest first so the oldest ones keep
+    their place in the queue. orders() returns the resting orders the engine
+    manages, by default every open order the OrderManager has in the ticker.
+    submit(orders) and cancel(ids) send the changes, by default straight
+    through the OrderManager.
+    """
+
+    def __init__(self, client, oms, ticker, tolerance=TOLERANCE, orders=None, submit=None, cancel=None):
+        self.client = client
+        self.oms = oms
+        self.ticker = ticker
+        self.tolerance = tolerance
+        self.orders = orders or (lambda: oms.open_orders(ticker))
+        self.submit = submit or self._submit
+        self.cancel = cancel or oms.cancel
+        self.updates = 0
+        self.orders_sent = 0
+        self.cancels_sent = 0
+        self.cancel_requests = 0
+        self.levels_kept = 0
+        self.naive_orders = 0
+
+    # this works out which orders to cancel and which to send to get from what is resting to the target
+    def diff(self, target):
+        resting = {}
+        for order in self.orders():
+            resting.setdefault((order.action, to_cents(order.price)), []).append(order)
+        cancels = []
+        new_orders = []
+        for key in set(resting) | set(target):
+            want = target.get(key, 0)
+            orders = sorted(resting.get(key, []), key=lambda o: o.submitted)
+            have = sum(o.remaining for o in orders)
+            if abs(have - want) <= self.tolerance and (want > 0 or not orders):
+                if orders:
+                    self.levels_kept += 1
+                continue
+            while orders and have > want:
+                newest = orders.pop()
+                cancels.append(newest.order_id)
+                have -= newest.remaining
+            if want - have > self.tolerance:
+                action, cents = key
+                new_orders.append((self.ticker, action, want - have, cents / 100))
+        return cancels, new_orders
+
+    async def _submit(self, orders):
+        batch = await submit_batch(self.client, orders)
+        self.oms.record_batch(batch)
+        return batch
+
+    # this sends the cancels and new orders for one update at the same time
+    async def update(self, target):
+        cancels, new_orders = self.diff(target)
+        self.updates += 1
+        self.naive_orders += len(target)
+        jobs = []
+        if cancels:
+            jobs.append(self.cancel(cancels))
+        if new_orders:
+            jobs.append(self.submit(new_orders))
+        await asyncio.gather(*jobs)
+        self.orders_sent += len(new_orders)
+        self.cancels_sent += len(cancels)
+        self.cancel_requests += bool(cancels)
+        return cancels, new_orders
+
+    def stats(self):
+        return {
+            'updates': self.updates,
+            'orders_sent': self.orders_sent,
+            'cancels_sent': self.cancels_sent,
+            'cancel_requests': self.cancel_requests,
+            'levels_kept': self.levels_kept,
+            'naive_orders': self.naive_orders,
+        }
+
+
+# this is the main method, the alltogether.py ladder re-quoted every tick through the quote engine
+async def main(ticker='ALGO'):
+    async with RitClient() as client:
+        oms = OrderManager(client)
+        engine = QuoteEngine(client, oms, ticker)
+        scheduler = TickScheduler(client, start_tick=2, stop_tick=297)
+
+        async def on_tick(tick):
+            if shutdown:
+                scheduler.stop()
+                return
+            close, position, reconciled = await asyncio.gather(
+                client.ticker_close(ticker), client.get_position(ticker), oms.maybe_reconcile())
+            await engine.update(target_ladder(close, position))
+
+        scheduler.on_tick(on_tick)
+        await scheduler.run()
+        await oms.cancel_all()
+        print(engine.stats())
+
+# this calls the main() method when you type 'python quote_engine.py' into the command prompt
+if __name__ == '__main__':
+    signal.signal(signal.SIGINT, signal_handler)
+    asyncio.run(main())
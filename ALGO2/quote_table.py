@@ -0,0 +1,162 @@
+# This works out the whole ladder for every inventory bucket once, at startup
+#
+#   table = QuoteTable.from_config(CONFIG)                # or QuoteTable.load('quotes.json')
+#   target = table.target(close, position)                # same dict as quote_engine.target_ladder
+#   python quote_table.py --ticker ALGO --config quotes.json
+#
+# alltogether.py re-runs the same > 10000 / < -10000 / else branch for every spread
+# level to pick BUY_VOLUME and SELL_VOLUME. Here the branches become buckets of
+# position, and each bucket's prices and sizes on both sides are built once from the
+# config. Quoting for a position is then one bisect over the bucket edges and one
+# index into the table, whatever the number of levels or buckets.
+#
+# A config is either the target_ladder settings (levels, limit, light_volume,
+# heavy_volume) or explicit buckets, each the lowest position it covers and one
+# [spread, buy volume, sell volume] per level:
+#
+#   {"buckets": [[null,   [[0.01, 500, 10], [0.02, 500, 10]]],
+#                [-10000, [[0.01, 350, 350], [0.02, 500, 500]]],
+#                [10001,  [[0.01, 10, 500], [0.02, 10, 500]]]]}
+
+import argparse
+import asyncio
+import bisect
+import json
+import signal
+
+import numpy as np
+
+from oms import OrderManager
+from positions import PositionTracker
+from quote_engine import HEAVY_VOLUME, LEVELS, LIGHT_VOLUME, POSITION_LIMIT, QuoteEngine, to_cents
+from rit_client import RitClient
+from tick_scheduler import TickScheduler
+
+CONFIG = {
+    'levels': LEVELS,
+    'limit': POSITION_LIMIT,
+    'light_volume': LIGHT_VOLUME,
+    'heavy_volume': HEAVY_VOLUME,
+}
+ACTIONS = ('BUY', 'SELL')
+
+shutdown = False
+
+# this signal handler allows for a graceful shutdown when CTRL+C is pressed
+def signal_handler(signum, frame):
+    global shutdown
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    shutdown = True
+
+
+# this turns the target_ladder settings into the three buckets it branches between
+def ladder_buckets(levels=LEVELS, limit=POSITION_LIMIT, light_volume=LIGHT_VOLUME, heavy_volume=HEAVY_VOLUME):
+    return [
+        (None, [(spread, heavy_volume, light_volume) for spread, volume in levels]),
+        (-limit, [(spread, volume, volume) for spread, volume in levels]),
+        # positions are whole shares, so this is target_ladder's position > limit
+        (limit + 1, [(spread, light_volume, heavy_volume) for spread, volume in levels]),
+    ]
+
+
+class QuoteTable:
+    """
+    The ladder for every position bucket, computed up front.
+
+    offsets[b, side, level] is the distance from fair value in cents, negative
+    on the buy side, and sizes[b, side, level] the volume, side 0 buying and
+    side 1 selling. Buckets with fewer levels are padded with zero sizes.
+    rows[b] holds the same ladder as (action, offset, quantity) with zero
+    sizes dropped and levels at the same price merged, which is what
+    target() reads.
+    """
+
+    def __init__(self, buckets):
+        if not buckets or buckets[0][0] is not None:
+            raise ValueError('the first bucket must start at None, it covers every position below the next one')
+        self.edges = [low for low, levels in buckets[1:]]
+        if any(a >= b for a, b in zip(self.edges, self.edges[1:])):
+            raise ValueError('bucket starts must increase, got %s' % self.edges)
+        depth = max(len(levels) for low, levels in buckets)
+        self.offsets = np.zeros((len(buckets), 2, depth), dtype=np.int64)
+        self.sizes = np.zeros((len(buckets), 2, depth), dtype=np.int64)
+        self.rows = []
+        for b, (low, levels) in enumerate(buckets):
+            merged = {}
+            for level, (spread, buy_volume, sell_volume) in enumerate(levels):
+                cents = to_cents(spread)
+                for side, (offset, volume) in enumerate(((-cents, buy_volume), (cents, sell_volume))):
+                    self.offsets[b, side, level] = offset
+                    self.sizes[b, side, level] = volume
+                    if volume > 0:
+                        key = (ACTIONS[side], offset)
+                        merged[key] = merged.get(key, 0) + int(volume)
+            self.rows.append(tuple((action, offset, qty) for (action, offset), qty in merged.items()))
+
+    @classmethod
+    def from_config(cls, config=CONFIG):
+        if 'buckets' in config:
+            return cls([(low, [tuple(level) for level in levels]) for low, levels in config['buckets']])
+        return cls(ladder_buckets(**{k: config[k] for k in CONFIG if k in config}))
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            return cls.from_config(json.load(f))
+
+    def bucket(self, position):
+        return bisect.bisect_right(self.edges, position)
+
+    # this returns the (offsets, sizes) arrays for a position, shape (2 sides, levels)
+    def lookup(self, position):
+        b = self.bucket(position)
+        return self.offsets[b], self.sizes[b]
+
+    # this builds the target ladder {(action, price in cents): quantity} for quote_engine.QuoteEngine
+    def target(self, fair, position):
+        fair = to_cents(fair)
+        return {(action, fair + offset): qty for action, offset, qty in self.rows[self.bucket(position)]}
+
+    def describe(self):
+        lines = []
+        for b, row in enumerate(self.rows):
+            low = 'below %d' % self.edges[0] if b == 0 else 'from %d' % self.edges[b - 1]
+            lines.append('%-12s %s' % (low, ' '.join('%s%+d:%d' % (action[0], offset, qty) for action, offset, qty in row)))
+        return '\n'.join(lines)
+
+
+# this is the main method, the alltogether.py ladder quoted from the table with the position read from memory
+async def main():
+    parser = argparse.ArgumentParser(description='Quote the ladder from a precomputed position bucket table')
+    parser.add_argument('--ticker', default='ALGO')
+    parser.add_argument('--config', help='JSON file with the ladder settings or buckets, default is quote_engine.py')
+    args = parser.parse_args()
+
+    table = QuoteTable.load(args.config) if args.config else QuoteTable.from_config()
+    print(table.describe())
+    ticker = args.ticker
+    async with RitClient() as client:
+        oms = OrderManager(client)
+        tracker = PositionTracker(oms)
+        engine = QuoteEngine(client, oms, ticker)
+        scheduler = TickScheduler(client, start_tick=2, stop_tick=297)
+        await tracker.reconcile()
+
+        async def on_tick(tick):
+            if shutdown:
+                scheduler.stop()
+                return
+            close, reconciled = await asyncio.gather(client.ticker_close(ticker), tracker.maybe_reconcile())
+            tracker.mark(ticker, close)
+            await engine.update(table.target(close, tracker.position(ticker)))
+
+        scheduler.on_tick(on_tick)
+        await scheduler.run()
+        await oms.cancel_all()
+        print(engine.stats())
+        print(tracker.stats())
+
+# this calls the main() method when you type 'python quote_table.py' into the command prompt
+if __name__ == '__main__':
+    signal.signal(signal.SIGINT, signal_handler)
+    asyncio.run(main())
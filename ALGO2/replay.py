@@ -0,0 +1,308 @@
+# This records a live RIT case tick by tick and replays it against the ALGO2 scripts offline
+#
+#   python replay.py record case.jsonl                   # run next to a live case
+#   python replay.py replay case.jsonl alltogether       # run alltogether.main() on the recording
+#
+# A recording is one JSON line per tick with every ticker's last bar, the other
+# traders' resting orders and our position, plus our open orders and new fills.
+# On replay the scripts get a fake requests.Session, so get_tick, ticker_close,
+# ticker_bid_ask, get_orders and buy_sell run unchanged. Our orders go into the
+# mock_server matching engine and fill when the recorded book trades through them.
+# Time is virtual: every request costs request_cost seconds and sleep() just moves
+# the clock, so a 300 tick case replays in a fraction of a second.
+
+import argparse
+import asyncio
+import importlib
+import json
+import signal
+import time
+from urllib.parse import parse_qs
+
+from mock_server import MARKET_ID, MockExchange, to_cents
+from rit_client import RitClient
+from tick_scheduler import TickScheduler
+
+TICKERS = ['ALGO']
+# virtual seconds each replayed request takes, about one round trip to the RIT client on the trading machine
+REQUEST_COST = 0.005
+# the scripts only trade once the case is a few ticks in, so replays start here
+START_TICK = 5
+
+shutdown = False
+
+# this signal handler allows for a graceful shutdown when CTRL+C is pressed
+def signal_handler(signum, frame):
+    global shutdown
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    shutdown = True
+
+
+class Recorder:
+    """
+    Writes one frame per tick while a live case runs.
+
+    Our own resting orders are left out of the recorded book so a replay does
+    not trade against a copy of itself.
+    """
+
+    def __init__(self, client, path, tickers=TICKERS):
+        self.client = client
+        self.path = path
+        self.tickers = list(tickers)
+        self.trader_id = None
+        self.seen_fills = set()
+        self.frames = 0
+
+    async def _ticker_frame(self, ticker):
+        book, history = await asyncio.gather(self.client.get_book(ticker), self.client.get_history(ticker, 1))
+        frame = {
+            'bids': [[o['price'], o['quantity'] - o['quantity_filled']] for o in book['bids'] if o.get('trader_id') != self.trader_id],
+            'asks': [[o['price'], o['quantity'] - o['quantity_filled']] for o in book['asks'] if o.get('trader_id') != self.trader_id],
+        }
+        if history:
+            frame['bar'] = history[0]
+        return frame
+
+    async def frame(self, tick):
+        ticker_frames, securities, open_orders, transacted = await asyncio.gather(
+            asyncio.gather(*(self._ticker_frame(t) for t in self.tickers)),
+            self.client.get_securities(),
+            self.client.get_orders('OPEN'),
+            self.client.get_orders('TRANSACTED'),
+        )
+        positions = {s['ticker']: s['position'] for s in securities}
+        frame = {'tick': tick, 'tickers': {}}
+        for ticker, data in zip(self.tickers, ticker_frames):
+            data['position'] = positions.get(ticker, 0)
+            frame['tickers'][ticker] = data
+        frame['orders'] = open_orders
+        frame['fills'] = [o for o in transacted if o['order_id'] not in self.seen_fills]
+        self.seen_fills.update(o['order_id'] for o in frame['fills'])
+        return frame
+
+    async def run(self, start_tick=1, stop_tick=300):
+        trader = await self.client.get_trader()
+        self.trader_id = trader.get('trader_id')
+        case = await self.client.get_case()
+        scheduler = TickScheduler(self.client, start_tick=start_tick, stop_tick=stop_tick)
+        with open(self.path, 'w') as f:
+            f.write(json.dumps({'case': case, 'tickers': self.tickers}) + '\n')
+
+            async def on_tick(tick):
+                if shutdown:
+                    scheduler.stop()
+                    return
+                f.write(json.dumps(await self.frame(tick)) + '\n')
+                f.flush()
+                self.frames += 1
+
+            scheduler.on_tick(on_tick)
+            await scheduler.run()
+
+
+# this reads a recording back as (header, {tick: frame})
+def load_recording(path):
+    with open(path) as f:
+        header = json.loads(f.readline())
+        frames = {}
+        for line in f:
+            if line.strip():
+                frame = json.loads(line)
+                frames[frame['tick']] = frame
+    return header, frames
+
+
+class ReplayExchange(MockExchange):
+    """
+    MockExchange driven by a recording instead of synthetic flow.
+
+    At every tick the other traders' book is replaced by the recorded one, so
+    any of our resting orders the new book crosses are filled by the matching
+    engine. History is the recorded bars and the clock is virtual.
+    """
+
+    def __init__(self, header, frames, tick_duration=1.0, start_tick=START_TICK):
+        self.frames = frames
+        self.virtual = 0.0
+        ticks = sorted(frames)
+        first = frames[ticks[0]]
+        tickers = {t: (f.get('bar') or {}).get('close') or _mid(f) for t, f in first['tickers'].items()}
+        ticks_per_period = header.get('case', {}).get('ticks_per_period') or ticks[-1] + 1
+        super().__init__(tickers=tickers, tick_duration=tick_duration, start_tick=max(ticks[0], start_tick),
+                         ticks_per_period=max(ticks_per_period, ticks[-1] + 1))
+        self.last_frame_tick = ticks[-1]
+
+    def elapsed(self):
+        return self.virtual
+
+    # this moves virtual time forward and catches the case clock up
+    def advance_time(self, seconds):
+        with self.lock:
+            self.virtual += seconds
+            self.sync_clock()
+
+    def sync_clock(self):
+        super().sync_clock()
+        # past the end of the recording the case is over
+        if self.tick > self.last_frame_tick:
+            self.tick = self.ticks_per_period
+
+    def _advance_one(self):
+        self.tick += 1
+        frame = self.frames.get(self.tick)
+        if frame is None:
+            return
+        for ticker, data in frame['tickers'].items():
+            if ticker not in self.books:
+                continue
+            bar = data.get('bar')
+            if bar and (not self.bars[ticker] or self.bars[ticker][-1]['tick'] < bar['tick']):
+                self.bars[ticker].append(bar)
+                self.last[ticker] = to_cents(bar['close'])
+            self._load_book(ticker, data)
+
+    # this swaps the other traders' resting orders for the ones recorded at this tick
+    def _load_book(self, ticker, data):
+        book = self.books[ticker]
+        for o in book.orders('BUY') + book.orders('SELL'):
+            if o['trader_id'] == MARKET_ID:
+                self._cancel(o)
+        for action, side in (('BUY', 'bids'), ('SELL', 'asks')):
+            for price, quantity in data.get(side, ()):
+                if quantity > 0:
+                    self._submit(MARKET_ID, ticker, 'LIMIT', quantity, action, price)
+
+
+def _mid(frame):
+    if frame.get('bids') and frame.get('asks'):
+        return (frame['bids'][0][0] + frame['asks'][0][0]) / 2
+    return 0.0
+
+
+class ReplayResponse:
+    def __init__(self, status_code, body):
+        self.status_code = status_code
+        self.ok = status_code < 400
+        self.body = body
+
+    def json(self):
+        return self.body
+
+    @property
+    def text(self):
+        return json.dumps(self.body)
+
+
+class ReplaySession:
+    """
+    Stands in for requests.Session in the ALGO2 scripts during a replay.
+
+    Only the parts the scripts use are provided: headers, get, post, delete and
+    use as a context manager.
+    """
+
+    def __init__(self, exchange, request_cost=REQUEST_COST):
+        self.exchange = exchange
+        self.request_cost = request_cost
+        self.headers = {}
+        self.requests = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def close(self):
+        pass
+
+    def request(self, method, url, params=None, **kwargs):
+        self.requests += 1
+        # handle() catches the clock up, so only the virtual time needs moving here
+        self.exchange.virtual += self.request_cost
+        path, _, query_string = url.partition('?')
+        path = path[path.find('/v1'):]
+        query = {k: v[-1] for k, v in parse_qs(query_string).items()} if query_string else {}
+        if params:
+            query.update({k: str(v) for k, v in params.items()})
+        status, body = self.exchange.handle(method.upper(), path, query, self.headers)
+        return ReplayResponse(status, body)
+
+    def get(self, url, params=None, **kwargs):
+        return self.request('GET', url, params, **kwargs)
+
+    def post(self, url, params=None, **kwargs):
+        return self.request('POST', url, params, **kwargs)
+
+    def delete(self, url, params=None, **kwargs):
+        return self.request('DELETE', url, params, **kwargs)
+
+
+class _RequestsShim:
+    def __init__(self, session):
+        self.session = session
+
+    def Session(self):
+        return self.session
+
+
+# this runs one of the scripts' main() against a recording and returns the exchange and session it used
+def replay_script(module, header, frames, request_cost=REQUEST_COST, tick_duration=1.0):
+    if isinstance(module, str):
+        module = importlib.import_module(module)
+    exchange = ReplayExchange(header, frames, tick_duration)
+    session = ReplaySession(exchange, request_cost)
+    saved = {name: getattr(module, name) for name in ('requests', 'sleep') if hasattr(module, name)}
+    module.requests = _RequestsShim(session)
+    module.sleep = exchange.advance_time
+    try:
+        module.main()
+    finally:
+        for name, value in saved.items():
+            setattr(module, name, value)
+    return exchange, session
+
+
+# this prints what a replay did: requests made, fills, final position and P&L per ticker
+def replay_report(exchange, session, elapsed):
+    report = {'wall_seconds': elapsed, 'requests': session.requests, 'virtual_seconds': exchange.virtual,
+              'orders': sum(1 for o in exchange.orders.values() if o['trader_id'] != MARKET_ID)}
+    for ticker, account in exchange.accounts.items():
+        last = exchange.last[ticker] / 100
+        report[ticker] = {'position': account.position, 'realized': account.realized,
+                          'unrealized': account.position * last - account.cost}
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Record a live RIT case or replay one against a script')
+    commands = parser.add_subparsers(dest='command', required=True)
+    record = commands.add_parser('record')
+    record.add_argument('path')
+    record.add_argument('--tickers', default=','.join(TICKERS))
+    play = commands.add_parser('replay')
+    play.add_argument('path')
+    play.add_argument('script', help='module name of the script, e.g. alltogether')
+    play.add_argument('--request-cost', type=float, default=REQUEST_COST)
+    args = parser.parse_args()
+
+    if args.command == 'record':
+        signal.signal(signal.SIGINT, signal_handler)
+
+        async def record_case():
+            async with RitClient() as client:
+                recorder = Recorder(client, args.path, args.tickers.split(','))
+                await recorder.run()
+                print('recorded %d ticks to %s' % (recorder.frames, args.path))
+
+        asyncio.run(record_case())
+    else:
+        header, frames = load_recording(args.path)
+        start = time.perf_counter()
+        exchange, session = replay_script(args.script, header, frames, args.request_cost)
+        print(json.dumps(replay_report(exchange, session, time.perf_counter() - start), indent=2))
+
+# this calls the main() method when you type 'python replay.py' into the command prompt
+if __name__ == '__main__':
+    main()
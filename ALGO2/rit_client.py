@@ -0,0 +1,235 @@
+# This is a shared asyncio client for the RIT REST API used by the ALGO2 scripts
+
+import asyncio
+import signal
+import time
+from dataclasses import dataclass
+
+from lanes import LanePool, lane_sizes
+from metrics import endpoint_name
+from throttle import Throttle, retry_after
+
+# this class definition allows us to print error messages and stop the program when needed
+class ApiException(Exception):
+    pass
+
+# set your API key to authenticate to the RIT client
+API_KEY = {'X-API-Key': '474RQCA1'}
+BASE_URL = 'http://localhost:9999/v1'
+# number of requests that can be in flight at the same time
+MAX_CONNECTIONS = 8
+
+AUTH_ERROR = 'The API key provided in this Python code must match that in the RIT client (please refer to the API hyperlink in the client toolbar and/or the RIT – User Guide – REST API Documentation.pdf)'
+
+shutdown = False
+
+# this signal handler allows for a graceful shutdown when CTRL+C is pressed
+def signal_handler(signum, frame):
+    global shutdown
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    shutdown = True
+
+
+# everything one loop iteration needs for a ticker, fetched in a single concurrent round trip
+@dataclass
+class Snapshot:
+    ticker: str
+    tick: int
+    close: float
+    bid: float
+    ask: float
+    position: float
+    orders: list
+    book: dict
+
+
+class RitClient:
+    """
+    Asyncio wrapper around the RIT REST API.
+
+    Requests run on requests.Sessions inside small thread pools, so several
+    coroutines awaiting the client at once go out over separate connections
+    at the same time instead of one after the other. The connections are
+    split into lanes.LanePool lanes so orders and cancels never queue behind
+    market data reads; lanes maps lane name to connections to override the
+    split of max_connections. Pass a metrics.Metrics to time every request
+    per endpoint.
+
+    Order submissions go through a throttle.Throttle that learns the case's
+    order limit from 429 responses and sends orders rejected with 429 again.
+    Pass throttle=False to send every order straight away.
+    """
+
+    def __init__(self, api_key=API_KEY, base_url=BASE_URL, max_connections=MAX_CONNECTIONS, metrics=None, throttle=None,
+                 lanes=None):
+        self.base_url = base_url
+        self.metrics = metrics
+        self.throttle = Throttle() if throttle is None else throttle or None
+        self.pool = LanePool(api_key, lanes or lane_sizes(max_connections))
+        self.max_connections = self.pool.size
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.pool.close()
+
+    # this helper method sends one request on the thread pool and checks the API key was accepted
+    async def request(self, method, path, params=None):
+        if self.throttle is not None and method == 'POST' and path == '/orders':
+            resp = await self.throttled(method, path, params)
+        else:
+            resp = await self.send(method, path, params)
+        if resp.status_code == 401:
+            raise ApiException(AUTH_ERROR)
+        return resp
+
+    # this sends an order when the throttle allows it and retries it while the server answers 429
+    async def throttled(self, method, path, params):
+        throttle = self.throttle
+        for attempt in range(throttle.max_retries + 1):
+            if attempt:
+                throttle.retried += 1
+            await throttle.acquire()
+            resp = await self.send(method, path, params)
+            if resp.status_code != 429:
+                throttle.accepted()
+                return resp
+            throttle.rejected_with(retry_after(resp))
+        throttle.dropped += 1
+        return resp
+
+    async def send(self, method, path, params=None):
+        url = self.base_url + path
+        if self.metrics is None:
+            resp = await self.pool.request(method, url, path, params)
+        else:
+            start = time.perf_counter()
+            try:
+                resp = await self.pool.request(method, url, path, params)
+            finally:
+                self.metrics.record(endpoint_name(method, path), time.perf_counter() - start)
+        return resp
+
+    async def get_json(self, path, params=None):
+        resp = await self.request('GET', path, params)
+        return resp.json()
+
+    async def get_case(self):
+        return await self.get_json('/case')
+
+    # this helper method returns the current 'tick' of the running case
+    async def get_tick(self):
+        case = await self.get_case()
+        return case['tick']
+
+    async def get_trader(self):
+        return await self.get_json('/trader')
+
+    async def get_history(self, ticker, limit=1):
+        return await self.get_json('/securities/history', {'ticker': ticker, 'limit': limit})
+
+    # this helper method returns the last close price for the given security, one tick ago
+    async def ticker_close(self, ticker):
+        ticker_history = await self.get_history(ticker, 1)
+        if ticker_history:
+            return ticker_history[0]['close']
+        raise ApiException('Response error. Unexpected JSON response.')
+
+    async def get_book(self, ticker):
+        return await self.get_json('/securities/book', {'ticker': ticker})
+
+    # this helper method returns the best bid and best ask for the given security
+    async def ticker_bid_ask(self, ticker):
+        book = await self.get_book(ticker)
+        return top_of_book(book)
+
+    async def get_securities(self, ticker=None):
+        params = {'ticker': ticker} if ticker else None
+        return await self.get_json('/securities', params)
+
+    # this helper method returns our current position in the given security
+    async def get_position(self, ticker):
+        securities = await self.get_securities(ticker)
+        return securities[0]['position']
+
+    # this helper method gets all the orders of a given type (OPEN/TRANSACTED/CANCELLED)
+    async def get_orders(self, status):
+        return await self.get_json('/orders', {'status': status})
+
+    async def get_order(self, order_id):
+        return await self.get_json('/orders/%d' % order_id)
+
+    # this helper method submits one limit order and returns the response
+    async def post_order(self, ticker, action, quantity, price, order_type='LIMIT'):
+        payload = {'ticker': ticker, 'type': order_type, 'quantity': quantity, 'action': action, 'price': price}
+        return await self.request('POST', '/orders', payload)
+
+    # this helper method submits a pair of limit orders to buy and sell at the last price +/- spread, both at once
+    async def buy_sell(self, to_buy, to_sell, last, buy_volume, sell_volume, spread):
+        return await asyncio.gather(
+            self.post_order(to_buy, 'BUY', buy_volume, last - spread),
+            self.post_order(to_sell, 'SELL', sell_volume, last + spread),
+        )
+
+    # this puts in a order 1 cent above the current bid
+    async def buy_bid(self, to_buy, bid, volume):
+        return await self.post_order(to_buy, 'BUY', volume, bid + .01)
+
+    # this puts in a order 1 cent below the current ask
+    async def sell_ask(self, to_sell, ask, volume):
+        return await self.post_order(to_sell, 'SELL', volume, ask - .01)
+
+    # this helper method cancels all open orders
+    async def cancel_all(self):
+        return await self.request('POST', '/commands/cancel', {'all': 1})
+
+    # this helper method cancels a list of order ids (or every open order in a ticker) in one request
+    async def cancel(self, ids=None, ticker=None):
+        if ids:
+            params = {'ids': ','.join(str(i) for i in ids)}
+        elif ticker:
+            params = {'ticker': ticker}
+        else:
+            raise ValueError('cancel needs ids or a ticker, use cancel_all to cancel everything')
+        return await self.request('POST', '/commands/cancel', params)
+
+    # this pulls case, history, book, securities and orders for a ticker concurrently
+    async def snapshot(self, ticker, status='OPEN'):
+        case, history, book, securities, orders = await asyncio.gather(
+            self.get_case(),
+            self.get_history(ticker, 1),
+            self.get_book(ticker),
+            self.get_securities(ticker),
+            self.get_orders(status),
+        )
+        if not history:
+            raise ApiException('Response error. Unexpected JSON response.')
+        bid, ask = top_of_book(book)
+        return Snapshot(ticker, case['tick'], history[0]['close'], bid, ask, securities[0]['position'], orders, book)
+
+
+# this helper method reads the best bid and ask out of a /securities/book response
+def top_of_book(book):
+    if not book.get('bids') or not book.get('asks'):
+        raise ApiException('Response error. Empty order book.')
+    return book['bids'][0]['price'], book['asks'][0]['price']
+
+
+# this prints one concurrent snapshot per loop so the client can be checked against a running case
+async def main():
+    async with RitClient() as client:
+        tick = await client.get_tick()
+        while tick > 1 and tick < 297 and not shutdown:
+            snap = await client.snapshot('ALGO')
+            print(snap.tick, snap.close, snap.bid, snap.ask, snap.position, len(snap.orders))
+            tick = snap.tick
+            await asyncio.sleep(.1)
+
+# this calls the main() method when you type 'python rit_client.py' into the command prompt
+if __name__ == '__main__':
+    signal.signal(signal.SIGINT, signal_handler)
+    asyncio.run(main())
@@ -0,0 +1,337 @@
+# This runs several strategies in one process on top of one shared market data feed
+#
+#   runner = StrategyRunner(client, [LadderStrategy('ALGO'), ScalpStrategy(['ALG', 'ALGOO'])])
+#   await runner.run()
+#
+# The runner polls each ticker's book once per book_interval, the closes once per tick
+# and our orders and positions through one OrderManager and PositionTracker, then hands
+# the results to every strategy that trades that ticker. Two strategies on the same
+# ticker cost the same requests as one. A strategy implements any of:
+#
+#   on_start(ctx)                        before the first tick
+#   on_tick(ctx, tick)                   once per case tick, after the closes are in
+#   on_book(ctx, ticker, book)           when a ticker's order_book.DepthBook changed
+#   on_fill(ctx, order, quantity, price) when one of the orders it sent fills
+#   on_stop(ctx)                         after the last tick
+#
+# and may return a coroutine from any of them.
+
+import asyncio
+import inspect
+import signal
+import time
+
+from multi_ticker import SCALP_REPEAT, SCALP_SPREAD, scalp_volumes
+from oms import OrderManager
+from order_book import DepthBook
+from order_submitter import submit_batch
+from positions import PositionTracker
+from quote_engine import QuoteEngine
+from quote_table import QuoteTable
+from rit_client import RitClient
+from tick_scheduler import TickScheduler
+
+# seconds between book polls
+BOOK_INTERVAL = 0.05
+
+shutdown = False
+
+# this signal handler allows for a graceful shutdown when CTRL+C is pressed
+def signal_handler(signum, frame):
+    global shutdown
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    shutdown = True
+
+
+class Strategy:
+    """
+    Base class for strategies hosted by a StrategyRunner.
+
+    tickers lists the tickers whose books and ticks the strategy wants.
+    Every callback does nothing unless overridden.
+    """
+
+    tickers = ()
+
+    def on_start(self, ctx):
+        pass
+
+    def on_tick(self, ctx, tick):
+        pass
+
+    def on_book(self, ctx, ticker, book):
+        pass
+
+    def on_fill(self, ctx, order, quantity, price):
+        pass
+
+    def on_stop(self, ctx):
+        pass
+
+    # this is what the strategy wants reported alongside the runner's stats
+    def stats(self):
+        return {}
+
+
+class StrategyContext:
+    """
+    What one strategy sees of the runner: shared market data, read from memory,
+    and order entry that remembers which orders are this strategy's.
+    """
+
+    def __init__(self, runner, strategy):
+        self.runner = runner
+        self.strategy = strategy
+        self.client = runner.client
+        self.oms = runner.oms
+
+    @property
+    def tick(self):
+        return self.runner.scheduler.tick
+
+    def close(self, ticker):
+        return self.runner.closes.get(ticker)
+
+    def book(self, ticker):
+        return self.runner.books[ticker]
+
+    def position(self, ticker):
+        return self.runner.tracker.position(ticker)
+
+    def open_orders(self, ticker=None):
+        return [o for o in self.oms.open_orders(ticker) if o.owner is self.strategy]
+
+    # this sends a list of (ticker, action, quantity, price) orders and records them as ours
+    async def submit(self, orders):
+        batch = await submit_batch(self.client, orders)
+        # the owner is recorded with the order, so an order that fills on arrival still reaches our on_fill
+        self.oms.record_batch(batch, owner=self.strategy)
+        return batch
+
+    async def cancel(self, ids):
+        orders = self.oms.orders
+        return await self.oms.cancel([i for i in ids if i in orders and orders[i].owner is self.strategy])
+
+
+class StrategyRunner:
+    """
+    Hosts strategies over one poller.
+
+    Callbacks share the event loop, so the books, closes and positions a
+    strategy reads can change whenever its callback awaits; read what you need
+    before the first await. on_book reactions run as their own tasks so an
+    order round trip in one never holds up the feed for the other tickers. A
+    strategy has at most one reaction per ticker running, and if that ticker's
+    book changed in the meantime on_book is called once more when it ends.
+    on_fill also runs as a task, once the OrderManager has finished recording
+    the fill. A callback that raises stops the runner.
+    """
+
+    def __init__(self, client, strategies, start_tick=2, stop_tick=297, book_interval=BOOK_INTERVAL):
+        self.client = client
+        self.strategies = list(strategies)
+        self.book_interval = book_interval
+        self.tickers = sorted({t for s in self.strategies for t in s.tickers})
+        # other runners may share the account, so only our own orders and tickers are tracked
+        self.oms = OrderManager(client, adopt=False)
+        self.tracker = PositionTracker(self.oms, tickers=self.tickers)
+        self.scheduler = TickScheduler(client, start_tick=start_tick, stop_tick=stop_tick)
+        self.contexts = {id(s): StrategyContext(self, s) for s in self.strategies}
+        self.books = {t: DepthBook(t) for t in self.tickers}
+        self.closes = {}
+        self.book_polls = 0
+        self.book_events = 0
+        self.fill_events = 0
+        self.book_tasks = {}
+        self.book_pending = set()
+        self.fill_tasks = set()
+        self.error = None
+        self.oms.on_fill(self._on_fill)
+
+    def context(self, strategy):
+        return self.contexts[id(strategy)]
+
+    async def _call(self, callback, *args):
+        result = callback(*args)
+        if inspect.isawaitable(result):
+            await result
+
+    def _on_fill(self, order, quantity, price):
+        ctx = self.contexts.get(id(order.owner))
+        if ctx is None:
+            return
+        self.fill_events += 1
+        # fills arrive from inside OrderManager calls, so the strategy's reaction runs as its own task
+        # and an error in it cannot cut the OrderManager's update short
+        task = asyncio.ensure_future(self._call(ctx.strategy.on_fill, ctx, order, quantity, price))
+        self.fill_tasks.add(task)
+        task.add_done_callback(self._filled)
+
+    def _filled(self, task):
+        self.fill_tasks.discard(task)
+        self._failed(task)
+
+    # this stops the runner if a callback task raised, run() raises the first error once it has cleaned up
+    def _failed(self, task):
+        if task.cancelled() or task.exception() is None:
+            return False
+        self.error = self.error or task.exception()
+        self.scheduler.stop()
+        return True
+
+    async def _on_tick(self, tick):
+        if shutdown:
+            self.scheduler.stop()
+            return
+        closes = await asyncio.gather(*(self.client.ticker_close(t) for t in self.tickers))
+        for ticker, close in zip(self.tickers, closes):
+            self.closes[ticker] = close
+            self.tracker.mark(ticker, close)
+        for strategy in self.strategies:
+            await self._call(strategy.on_tick, self.context(strategy), tick)
+
+    # this calls a strategy's on_book and leaves any coroutine it returns running as a task
+    def _react(self, strategy, ticker):
+        key = (id(strategy), ticker)
+        if key in self.book_tasks:
+            self.book_pending.add(key)
+            return
+        result = strategy.on_book(self.context(strategy), ticker, self.books[ticker])
+        if inspect.isawaitable(result):
+            task = self.book_tasks[key] = asyncio.ensure_future(result)
+            task.add_done_callback(lambda t: self._reacted(strategy, ticker, t))
+
+    def _reacted(self, strategy, ticker, task):
+        key = (id(strategy), ticker)
+        del self.book_tasks[key]
+        if task.cancelled() or self._failed(task):
+            return
+        if key in self.book_pending and self.scheduler.running:
+            self.book_pending.discard(key)
+            self._react(strategy, ticker)
+
+    # this is the shared poller: every book once per interval, fanned out to the strategies that changed
+    async def _feed(self):
+        while self.scheduler.running:
+            started = time.monotonic()
+            books, reconciled = await asyncio.gather(
+                asyncio.gather(*(self.client.get_book(t) for t in self.tickers)), self.tracker.maybe_reconcile())
+            self.book_polls += 1
+            for ticker, data in zip(self.tickers, books):
+                if not self.books[ticker].apply_snapshot(data):
+                    continue
+                for strategy in self.strategies:
+                    if ticker in strategy.tickers:
+                        self.book_events += 1
+                        self._react(strategy, ticker)
+            await asyncio.sleep(max(0.0, self.book_interval - (time.monotonic() - started)))
+
+    async def run(self):
+        await self.tracker.reconcile()
+        for strategy in self.strategies:
+            await self._call(strategy.on_start, self.context(strategy))
+        self.scheduler.on_tick(self._on_tick)
+        clock = asyncio.ensure_future(self.scheduler.run())
+        # the feed starts once the case reaches the trading window
+        scheduler = self.scheduler
+        while not clock.done() and not shutdown and (scheduler.tick is None or scheduler.tick < scheduler.start_tick):
+            await asyncio.sleep(scheduler.fine_poll)
+        feed = asyncio.ensure_future(self._feed())
+        try:
+            await asyncio.gather(clock, feed)
+        finally:
+            self.scheduler.stop()
+            feed.cancel()
+            reactions = list(self.book_tasks.values()) + list(self.fill_tasks)
+            for task in reactions:
+                task.cancel()
+            await asyncio.gather(clock, feed, *reactions, return_exceptions=True)
+            for strategy in self.strategies:
+                await self._call(strategy.on_stop, self.context(strategy))
+            await self.oms.cancel_all()
+        if self.error is not None:
+            raise self.error
+
+    def stats(self):
+        return {
+            'book_polls': self.book_polls,
+            'book_events': self.book_events,
+            'fill_events': self.fill_events,
+            # what the strategies would have fetched polling their own books at the same rate
+            'book_requests_saved': self.book_polls * (sum(len(s.tickers) for s in self.strategies) - len(self.tickers)),
+            'tracker': self.tracker.stats(),
+            'strategies': [s.stats() for s in self.strategies],
+        }
+
+
+class LadderStrategy(Strategy):
+    """
+    The alltogether.py ladder, re-quoted every tick through a quote_engine.QuoteEngine.
+
+    The ladder for each position comes from a quote_table.QuoteTable, by
+    default one built from the quote_engine.py settings.
+    """
+
+    def __init__(self, ticker, table=None):
+        self.tickers = (ticker,)
+        self.ticker = ticker
+        self.table = table or QuoteTable.from_config()
+        self.engine = None
+
+    def on_start(self, ctx):
+        # only this strategy's orders count as the ladder, another strategy may be quoting the same ticker
+        self.engine = QuoteEngine(ctx.client, ctx.oms, self.ticker, orders=lambda: ctx.open_orders(self.ticker),
+                                  submit=ctx.submit, cancel=ctx.cancel)
+
+    async def on_tick(self, ctx, tick):
+        close = ctx.close(self.ticker)
+        if close is None:
+            return
+        await self.engine.update(self.table.target(close, ctx.position(self.ticker)))
+
+    def stats(self):
+        return dict(self.engine.stats(), ticker=self.ticker) if self.engine else {'ticker': self.ticker}
+
+
+class ScalpStrategy(Strategy):
+    """The MAIN_ALGO3.py scalper, reacting to book changes instead of polling its own books."""
+
+    def __init__(self, tickers, cooldowns=None):
+        self.tickers = tuple(tickers)
+        self.cooldowns = dict(cooldowns or {})
+        self.resume = {}
+        self.scalps = 0
+
+    async def on_book(self, ctx, ticker, book):
+        if time.monotonic() < self.resume.get(ticker, 0.0):
+            return
+        bid, ask = book.best_bid(), book.best_ask()
+        if bid is None or ask is None or ask - bid <= SCALP_SPREAD:
+            return
+        buy_volume, sell_volume = scalp_volumes(ctx.position(ticker))
+        orders = []
+        for i in range(SCALP_REPEAT):
+            if buy_volume:
+                orders.append((ticker, 'BUY', buy_volume, round(bid + .01, 2)))
+            if sell_volume:
+                orders.append((ticker, 'SELL', sell_volume, round(ask - .01, 2)))
+        self.resume[ticker] = time.monotonic() + self.cooldowns.get(ticker, 0.0)
+        self.scalps += 1
+        await ctx.submit(orders)
+
+    def stats(self):
+        return {'tickers': list(self.tickers), 'scalps': self.scalps}
+
+
+# this is the main method, the alltogether.py ladder on ALGO and the MAIN_ALGO3.py scalper on ALG and ALGOO in one process
+async def main():
+    async with RitClient() as client:
+        scalper = ScalpStrategy(['ALG', 'ALGOO'], cooldowns={'ALGOO': 2.0})
+        runner = StrategyRunner(client, [LadderStrategy('ALGO'), scalper])
+        await runner.run()
+        print(runner.stats())
+
+# this calls the main() method when you type 'python runner.py' into the command prompt
+if __name__ == '__main__':
+    signal.signal(signal.SIGINT, signal_handler)
+    asyncio.run(main())
@@ -0,0 +1,120 @@
+# This is a tick-keyed cache of market data so the ladder loop only hits the RIT API once per tick
+
+import asyncio
+
+from rit_client import top_of_book
+
+
+class SnapshotCache:
+    """
+    Serves close, book, position and open orders from memory within a tick.
+
+    Everything is dropped when the case tick advances. Posting an order through
+    the cache drops the book, position and orders for that ticker, since those
+    are the only things our own order changes. The close is the last finished
+    bar so it stays valid for the whole tick.
+    """
+
+    def __init__(self, client):
+        self.client = client
+        self.tick = None
+        self.entries = {}
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @property
+    def max_connections(self):
+        return self.client.max_connections
+
+    # this helper method always asks the server for the tick and clears the cache when it moves
+    async def get_tick(self):
+        tick = await self.client.get_tick()
+        self.advance(tick)
+        return tick
+
+    # this drops everything cached for the previous tick
+    def advance(self, tick):
+        if tick != self.tick:
+            self.tick = tick
+            self.entries.clear()
+
+    # this drops cached entries for one ticker (or everything when no ticker is given)
+    def invalidate(self, ticker=None):
+        self.invalidations += 1
+        if ticker is None:
+            self.entries.clear()
+            return
+        for key in list(self.entries):
+            if key[0] == 'orders' or (key[1] == ticker and key[0] != 'close'):
+                del self.entries[key]
+
+    # this returns a cached value or starts one fetch that concurrent callers share
+    async def _cached(self, key, fetch):
+        future = self.entries.get(key)
+        if future is not None:
+            self.hits += 1
+            return await asyncio.shield(future)
+        self.misses += 1
+        future = asyncio.ensure_future(fetch())
+        self.entries[key] = future
+        try:
+            return await asyncio.shield(future)
+        except Exception:
+            if self.entries.get(key) is future:
+                del self.entries[key]
+            raise
+
+    async def ticker_close(self, ticker):
+        return await self._cached(('close', ticker), lambda: self.client.ticker_close(ticker))
+
+    async def get_book(self, ticker):
+        return await self._cached(('book', ticker), lambda: self.client.get_book(ticker))
+
+    async def ticker_bid_ask(self, ticker):
+        book = await self.get_book(ticker)
+        return top_of_book(book)
+
+    async def get_position(self, ticker):
+        return await self._cached(('position', ticker), lambda: self.client.get_position(ticker))
+
+    async def get_orders(self, status='OPEN'):
+        return await self._cached(('orders', status), lambda: self.client.get_orders(status))
+
+    # these post through the client and then drop whatever our order made stale
+    async def post_order(self, ticker, action, quantity, price, order_type='LIMIT'):
+        try:
+            return await self.client.post_order(ticker, action, quantity, price, order_type)
+        finally:
+            self.invalidate(ticker)
+
+    async def buy_sell(self, to_buy, to_sell, last, buy_volume, sell_volume, spread):
+        try:
+            return await self.client.buy_sell(to_buy, to_sell, last, buy_volume, sell_volume, spread)
+        finally:
+            self.invalidate(to_buy)
+            if to_sell != to_buy:
+                self.invalidate(to_sell)
+
+    async def cancel_all(self):
+        try:
+            return await self.client.cancel_all()
+        finally:
+            self.invalidate()
+
+    # this reports how many round trips the cache saved
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'tick': self.tick,
+            'hits': self.hits,
+            'misses': self.misses,
+            'invalidations': self.invalidations,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'round_trips_saved': self.hits,
+        }
+
+    def reset_stats(self):
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
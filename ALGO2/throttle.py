@@ -0,0 +1,137 @@
+# This paces order submissions to the rate the RIT server allows instead of fixed sleeps
+#
+# RIT answers POST /v1/orders with 429 and {"wait": seconds} once we go over the case's
+# order limit. The throttle starts unlimited, and the first 429 tells it roughly what
+# the limit is: the number of orders the server accepted in the second before it. From
+# then on orders go out through a token bucket at that rate, the rate creeps up while
+# orders are accepted and drops again on the next 429, so we stay right at the limit.
+
+import asyncio
+import time
+from collections import deque
+
+# rate assumed after a 429 when too few orders were accepted to measure one
+MIN_RATE = 1.0
+# orders per second added to the rate for every accepted order once a limit is known
+INCREASE = 0.05
+# the rate is cut by this factor on a 429 that comes after the limit was learned
+BACKOFF = 0.9
+# times an order rejected with 429 is sent again before it is dropped
+MAX_RETRIES = 3
+# seconds of accepted orders used to measure the limit
+WINDOW = 1.0
+
+
+class Throttle:
+    """
+    Token bucket for order submissions that learns the server's limit.
+
+    Waiting callers are served in the order they arrived. rate is None until
+    the first 429. The counters say how often we waited for a token
+    (throttled), how often the server still said no (rejected), how many
+    orders were sent again (retried) and how many gave up (dropped).
+    """
+
+    def __init__(self, rate=None, burst=None, max_retries=MAX_RETRIES, min_rate=MIN_RATE,
+                 increase=INCREASE, backoff=BACKOFF, window=WINDOW):
+        self.rate = rate
+        self.burst = burst
+        self.max_retries = max_retries
+        self.min_rate = min_rate
+        self.increase = increase
+        self.backoff = backoff
+        self.window = window
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.accepted_at = deque()
+        self.lock = asyncio.Lock()
+        self.acquired = 0
+        self.throttled = 0
+        self.wait_time = 0.0
+        self.rejected = 0
+        self.retried = 0
+        self.dropped = 0
+
+    @property
+    def capacity(self):
+        if self.rate is None:
+            return 0.0
+        return self.burst if self.burst is not None else max(1.0, self.rate * self.window)
+
+    def _refill(self, now):
+        if self.rate is not None:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    # this waits until one order may be sent
+    async def acquire(self):
+        async with self.lock:
+            waited = False
+            start = time.monotonic()
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                if now < self.paused_until:
+                    delay = self.paused_until - now
+                elif self.rate is None:
+                    break
+                elif self.tokens >= 1:
+                    self.tokens -= 1
+                    break
+                else:
+                    delay = (1 - self.tokens) / self.rate
+                waited = True
+                await asyncio.sleep(delay)
+            self.acquired += 1
+            if waited:
+                self.throttled += 1
+                self.wait_time += time.monotonic() - start
+
+    # this is called for every order the server accepted
+    def accepted(self):
+        now = time.monotonic()
+        self.accepted_at.append(now)
+        while self.accepted_at and self.accepted_at[0] < now - self.window:
+            self.accepted_at.popleft()
+        if self.rate is not None:
+            self.rate += self.increase
+
+    # this is called for every 429, wait is the server's wait or Retry-After in seconds if it sent one
+    def rejected_with(self, wait=None):
+        now = time.monotonic()
+        self.rejected += 1
+        if self.rate is None:
+            recent = sum(1 for t in self.accepted_at if t >= now - self.window)
+            self.rate = max(self.min_rate, recent / self.window)
+        elif now >= self.paused_until:
+            # orders already in flight when the first 429 came back do not cut the rate again
+            self.rate = max(self.min_rate, self.rate * self.backoff)
+        self._refill(now)
+        self.tokens = 0.0
+        self.paused_until = max(self.paused_until, now + (wait if wait is not None else 1 / self.rate))
+
+    def stats(self):
+        return {
+            'rate': self.rate,
+            'acquired': self.acquired,
+            'throttled': self.throttled,
+            'wait_time': self.wait_time,
+            'rejected': self.rejected,
+            'retried': self.retried,
+            'dropped': self.dropped,
+        }
+
+
+# this reads how long a 429 response asks us to wait, from the body or the Retry-After header
+def retry_after(resp):
+    try:
+        wait = resp.json().get('wait')
+        if wait is not None:
+            return float(wait)
+    except (ValueError, AttributeError):
+        pass
+    try:
+        return float(resp.headers.get('Retry-After'))
+    except (TypeError, ValueError):
+        return None
@@ -0,0 +1,198 @@
+# This is an event-driven tick scheduler that replaces the `while tick > 1 and tick < 297` get_tick loops
+#
+# It learns how long a tick lasts by watching /v1/case, sleeps through the middle of
+# each tick and only polls quickly in a short window around the expected boundary.
+
+import asyncio
+import inspect
+import time
+
+# RIT runs one tick per second unless the case is sped up
+TICK_DURATION = 1.0
+# how often to poll inside the window around a boundary, this bounds how late we see a new tick
+FINE_POLL = 0.005
+# how long before the expected boundary to start fine polling
+GUARD = 0.05
+# while the tick is not moving (before the case starts, paused or stopped) poll this fraction of a tick apart
+COARSE = 0.25
+
+
+class TickScheduler:
+    """
+    Fires on_tick callbacks when the case tick changes and at_phase callbacks
+    part of the way through each tick (phase 0.5 fires half a tick in).
+
+    A new tick is seen at most about FINE_POLL plus one round trip after it
+    starts, while the number of polls per tick stays around GUARD / FINE_POLL
+    instead of however many a busy loop manages. Callbacks may be plain
+    functions or coroutines and are awaited in order, so a callback that runs
+    longer than a tick delays the next one just like the old loops did.
+
+    If the tick does not change by the time it should have, the clock is
+    taken to be stopped and polled only every coarse * tick_duration seconds
+    until it moves again, then the boundaries are relearned.
+    """
+
+    def __init__(self, client, start_tick=2, stop_tick=297, tick_duration=TICK_DURATION,
+                 fine_poll=FINE_POLL, guard=GUARD, alpha=0.2, coarse=COARSE):
+        self.client = client
+        self.start_tick = start_tick
+        self.stop_tick = stop_tick
+        self.tick_duration = tick_duration
+        self.fine_poll = fine_poll
+        self.guard = guard
+        self.alpha = alpha
+        self.coarse = coarse
+        self.tick_callbacks = []
+        self.phase_callbacks = []
+        self.running = False
+        self.tick = None
+        self.boundary = None
+        self.anchor = None
+        self.calibrated = False
+        self.polls = 0
+        self.ticks = 0
+        self.missed_ticks = 0
+        self.detections = 0
+        self.detect_latency_max = 0.0
+        self.detect_latency_total = 0.0
+
+    # this registers a callback(tick), it can also be used as a decorator
+    def on_tick(self, callback):
+        self.tick_callbacks.append(callback)
+        return callback
+
+    # this registers a callback(tick, fraction) to run `fraction` of the way through every tick
+    def at_phase(self, fraction, callback):
+        if not 0 < fraction < 1:
+            raise ValueError('phase must be between 0 and 1')
+        self.phase_callbacks.append((fraction, callback))
+        self.phase_callbacks.sort(key=lambda p: p[0])
+        return callback
+
+    def stop(self):
+        self.running = False
+
+    async def _poll(self):
+        self.polls += 1
+        return await self.client.get_tick()
+
+    async def _call(self, callback, *args):
+        result = callback(*args)
+        if inspect.isawaitable(result):
+            await result
+
+    # this updates the tick length estimate from a boundary we saw within one fine poll
+    # the first measurement replaces the starting guess, later ones are smoothed
+    def _learn(self, tick, boundary):
+        if self.anchor is not None:
+            anchor_tick, anchor_time = self.anchor
+            observed = (boundary - anchor_time) / (tick - anchor_tick)
+            if observed > 0:
+                if self.calibrated:
+                    self.tick_duration += self.alpha * (observed - self.tick_duration)
+                else:
+                    self.tick_duration = observed
+                    self.calibrated = True
+        self.anchor = (tick, boundary)
+
+    # this forgets the last boundary so the next two are measured from scratch
+    def _unlock(self):
+        self.anchor = None
+        self.calibrated = False
+        self.boundary = None
+
+    # this polls quickly until the tick changes or the deadline passes
+    # the change is only pinned down precisely if the first poll still saw the old tick
+    async def _wait_for_boundary(self, deadline):
+        before = time.monotonic()
+        polls = 0
+        while self.running:
+            tick = await self._poll()
+            polls += 1
+            now = time.monotonic()
+            if tick != self.tick or now >= deadline:
+                return tick, before, now, polls > 1
+            before = now
+            await asyncio.sleep(self.fine_poll)
+        return self.tick, before, time.monotonic(), False
+
+    # this polls slowly until the tick moves, for when the case clock is not running
+    async def _wait_for_change(self):
+        while self.running:
+            await asyncio.sleep(max(self.fine_poll, self.coarse * self.tick_duration))
+            tick = await self._poll()
+            if tick != self.tick:
+                return tick
+        return self.tick
+
+    # this records the new tick and fires the on_tick callbacks, boundary is None when we do not know when it started
+    async def _enter(self, tick, boundary):
+        if self.tick is not None and tick > self.tick:
+            self.missed_ticks += tick - self.tick - 1
+        if boundary is None:
+            self._unlock()
+        else:
+            self._learn(tick, boundary)
+        self.tick = tick
+        self.boundary = boundary if self.calibrated else None
+        if self.start_tick <= tick < self.stop_tick:
+            self.ticks += 1
+            for callback in self.tick_callbacks:
+                await self._call(callback, tick)
+
+    async def _run_phases(self):
+        if self.tick < self.start_tick:
+            return
+        for fraction, callback in self.phase_callbacks:
+            if not self.running:
+                return
+            await self._sleep_until(self.boundary + fraction * self.tick_duration)
+            await self._call(callback, self.tick, fraction)
+
+    async def run(self):
+        self.running = True
+        await self._enter(await self._poll(), None)
+        while self.running and self.tick < self.stop_tick:
+            if self.boundary is None:
+                # until two boundaries have been timed we do not know where in the tick we are
+                deadline = time.monotonic() + 2 * self.tick_duration
+            else:
+                await self._run_phases()
+                expected = self.boundary + self.tick_duration
+                await self._sleep_until(expected - self.guard)
+                deadline = expected + self.tick_duration
+            tick, before, seen, precise = await self._wait_for_boundary(deadline)
+            if tick == self.tick:
+                # the clock is paused or we misjudged the tick length, wait for it coarsely and relock on the next change
+                self._unlock()
+                tick = await self._wait_for_change()
+                if tick != self.tick:
+                    await self._enter(tick, None)
+                continue
+            if not precise:
+                # the tick changed while we were asleep so we overslept, relock on the next change
+                await self._enter(tick, None)
+                continue
+            self.detections += 1
+            self.detect_latency_max = max(self.detect_latency_max, seen - before)
+            self.detect_latency_total += seen - before
+            await self._enter(tick, (before + seen) / 2)
+        self.running = False
+
+    async def _sleep_until(self, when):
+        delay = when - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def stats(self):
+        return {
+            'tick': self.tick,
+            'ticks': self.ticks,
+            'polls': self.polls,
+            'polls_per_tick': self.polls / self.ticks if self.ticks else 0.0,
+            'missed_ticks': self.missed_ticks,
+            'tick_duration': self.tick_duration,
+            'detect_latency_max': self.detect_latency_max,
+            'detect_latency_mean': self.detect_latency_total / self.detections if self.detections else 0.0,
+        }
@@ -0,0 +1,151 @@
+# This is a fixed-size columnar store of per-tick market state for every ticker
+#
+# Each field is one NumPy array of shape (capacity, tickers) used as a ring buffer,
+# so memory stays the same however many cases we run. With a path the arrays live
+# in a memory-mapped file that another process can attach to and read without copying:
+#
+#   store = TickStore(['ALGO', 'ALG'], path='ticks.bin')       # writer
+#   store.append(tick, {'ALGO': {'bid': 9.99, 'ask': 10.01}})
+#   view = TickStore.attach('ticks.bin')                        # reader, read only
+#   view.window('bid', 'ALGO', 50)
+
+import asyncio
+
+import numpy as np
+
+FIELDS = [
+    ('tick', np.int64),
+    ('bid', np.float64),
+    ('ask', np.float64),
+    ('close', np.float64),
+    ('position', np.int64),
+    ('open_orders', np.int64),
+]
+CAPACITY = 4096
+MAGIC = 0x4B43495454495221
+VERSION = 1
+# header is 8 int64 slots: magic, version, capacity, tickers, count, and three spare
+HEADER_SLOTS = 8
+NAME_BYTES = 16
+
+
+def _layout(capacity, n_tickers):
+    offset = HEADER_SLOTS * 8 + n_tickers * NAME_BYTES
+    offset += -offset % 8
+    columns = {}
+    for name, dtype in FIELDS:
+        columns[name] = offset
+        offset += capacity * n_tickers * np.dtype(dtype).itemsize
+    return columns, offset
+
+
+def _empty(dtype):
+    return np.nan if np.issubdtype(dtype, np.floating) else 0
+
+
+class TickStore:
+    """
+    Ring buffer of per-tick rows, one column per field in FIELDS.
+
+    count is the number of rows ever appended and is written after the row
+    itself. Once the ring is full the next append overwrites the oldest row
+    before count moves, so readers only ever see the newest capacity - 1 rows
+    and the slot being written is never part of a window. A window is whole
+    until the writer has appended once more; copy it to keep it longer.
+    """
+
+    def __init__(self, tickers, capacity=CAPACITY, path=None):
+        self.tickers = list(tickers)
+        self.index = {t: i for i, t in enumerate(self.tickers)}
+        self.capacity = capacity
+        columns, size = _layout(capacity, len(self.tickers))
+        if path is None:
+            self.buffer = np.zeros(size, dtype=np.uint8)
+        else:
+            self.buffer = np.memmap(path, dtype=np.uint8, mode='w+', shape=(size,))
+        self.path = path
+        self.header = np.ndarray((HEADER_SLOTS,), dtype=np.int64, buffer=self.buffer, offset=0)
+        self.header[:5] = [MAGIC, VERSION, capacity, len(self.tickers), 0]
+        names = np.ndarray((len(self.tickers),), dtype='S%d' % NAME_BYTES, buffer=self.buffer, offset=HEADER_SLOTS * 8)
+        names[:] = [t.encode() for t in self.tickers]
+        self.columns = self._map_columns(columns)
+        for name, dtype in FIELDS:
+            self.columns[name][:] = _empty(dtype)
+
+    def _map_columns(self, offsets):
+        shape = (self.capacity, len(self.tickers))
+        return {name: np.ndarray(shape, dtype=dtype, buffer=self.buffer, offset=offsets[name]) for name, dtype in FIELDS}
+
+    # this opens a store another process is writing, read only and without copying anything
+    @classmethod
+    def attach(cls, path):
+        raw = np.memmap(path, dtype=np.uint8, mode='r')
+        header = np.ndarray((HEADER_SLOTS,), dtype=np.int64, buffer=raw, offset=0)
+        if header[0] != MAGIC or header[1] != VERSION:
+            raise ValueError('%s is not a tick store' % path)
+        capacity, n_tickers = int(header[2]), int(header[3])
+        names = np.ndarray((n_tickers,), dtype='S%d' % NAME_BYTES, buffer=raw, offset=HEADER_SLOTS * 8)
+        store = cls.__new__(cls)
+        store.tickers = [n.decode() for n in names]
+        store.index = {t: i for i, t in enumerate(store.tickers)}
+        store.capacity = capacity
+        store.buffer = raw
+        store.path = path
+        store.header = header
+        store.columns = store._map_columns(_layout(capacity, n_tickers)[0])
+        return store
+
+    @property
+    def count(self):
+        return int(self.header[4])
+
+    # one slot is kept back for the row the writer fills next
+    def __len__(self):
+        return min(self.count, self.capacity - 1)
+
+    # this writes one row: snapshot maps ticker -> {field: value}, anything left out is NaN or 0
+    def append(self, tick, snapshot):
+        row = self.count % self.capacity
+        for name, dtype in FIELDS:
+            self.columns[name][row] = _empty(dtype)
+        self.columns['tick'][row] = tick
+        for ticker, values in snapshot.items():
+            col = self.index[ticker]
+            for name, value in values.items():
+                self.columns[name][row, col] = value
+        self.header[4] = self.count + 1
+
+    # this returns the newest value of a field for one ticker
+    def latest(self, field, ticker):
+        if not self.count:
+            return None
+        return self.columns[field][(self.count - 1) % self.capacity, self.index[ticker]]
+
+    # this returns the last n rows of a field oldest first, a view when the rows are contiguous
+    def window(self, field, ticker=None, n=None):
+        count = self.count
+        n = len(self) if n is None else min(n, len(self))
+        column = self.columns[field]
+        if ticker is not None:
+            column = column[:, self.index[ticker]]
+        end = count % self.capacity or (self.capacity if count else 0)
+        start = end - n
+        if start >= 0:
+            return column[start:end]
+        return np.concatenate((column[start:], column[:end]))
+
+    def flush(self):
+        if isinstance(self.buffer, np.memmap) and self.buffer.mode != 'r':
+            self.buffer.flush()
+
+
+# this fetches a rit_client.Snapshot for every ticker at once and appends them as one row
+async def capture(store, client, tick=None):
+    snapshots = await asyncio.gather(*(client.snapshot(t) for t in store.tickers))
+    row = {}
+    for snap in snapshots:
+        open_orders = sum(1 for o in snap.orders if o['ticker'] == snap.ticker)
+        row[snap.ticker] = {'bid': snap.bid, 'ask': snap.ask, 'close': snap.close,
+                            'position': snap.position, 'open_orders': open_orders}
+    store.append(snapshots[0].tick if tick is None else tick, row)
+    return row